@@ -0,0 +1 @@
+"""Code shared by the photo, OCR and OTP packages (metrics, lazy exports)."""
@@ -0,0 +1,128 @@
+"""Cold-start cost of each entry point, from `python -X importtime`.
+
+    python -m common.bench_importtime
+    python -m common.bench_importtime --compare HEAD~1 --repeat 7
+
+Imports each module in a fresh interpreter and reports the median wall time
+over --repeat runs (minus a bare `python -c pass`), the module's cumulative
+import time from -X importtime, and which heavy dependencies came along.
+With --compare REF the same modules are measured in a `git archive` of REF
+as well, for a before/after table. A module that cannot be imported in a
+tree (or that blocks, like the old photo.py opening the webcam) shows n/a.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ENTRY_POINTS = [
+    "diksha.photo",
+    "diksha.detector",
+    "sunil.ocr",
+    "sunil.ocr_backends",
+    "sunil.aadhaar_fields",
+    "vicky.otp_email",
+    "kyc.server",
+]
+HEAVY = ["cv2", "numpy", "requests", "ssl", "smtplib", "sqlite3", "http.server", "cProfile", "email"]
+TIMEOUT = 60
+
+
+def _env():
+    env = dict(os.environ)
+    # Without cached bytecode every run would pay for compiling the tree
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.pop("KYC_METRICS", None)
+    return env
+
+
+def _run(code, cwd, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, env=_env(), stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True, timeout=TIMEOUT)
+    return time.perf_counter() - t0, proc
+
+
+def parse_importtime(stderr):
+    """{module: cumulative µs} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            modules[name.strip()] = int(cumulative)
+        except ValueError:
+            pass    # the header line
+    return modules
+
+
+def measure(module, cwd, repeat, baseline):
+    """(wall ms, cumulative ms, heavy modules loaded), or None if the import fails"""
+    code = f"import {module}"
+    try:
+        _, proc = _run(code, cwd, importtime=True)     # also warms the bytecode cache
+        if proc.returncode != 0:
+            return None
+        walls = [_run(code, cwd)[0] for _ in range(repeat)]
+    except subprocess.TimeoutExpired:
+        return None
+    modules = parse_importtime(proc.stderr)
+    heavy = [name for name in HEAVY if name in modules]
+    wall = max(0.0, statistics.median(walls) - baseline) * 1000
+    return wall, modules.get(module, 0) / 1000, heavy
+
+
+def measure_tree(cwd, repeat):
+    baseline = statistics.median(_run("pass", cwd)[0] for _ in range(repeat))
+    return {module: measure(module, cwd, repeat, baseline) for module in ENTRY_POINTS}
+
+
+def checkout(ref, into):
+    archive = subprocess.run(["git", "archive", ref], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", into], input=archive.stdout, check=True)
+
+
+def _fmt(result):
+    if result is None:
+        return f"{'n/a':>9} {'n/a':>9}"
+    wall, cumulative, _ = result
+    return f"{wall:9.1f} {cumulative:9.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the entry points")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", metavar="REF", default=None,
+                        help="also measure this git ref, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    after = measure_tree(root, args.repeat)
+    before = None
+    if args.compare:
+        with tempfile.TemporaryDirectory() as tmp:
+            checkout(args.compare, tmp)
+            before = measure_tree(tmp, args.repeat)
+
+    if before is None:
+        print(f"{'entry point':<22} {'wall ms':>9} {'cumul ms':>9}  heavy modules loaded")
+        for module, result in after.items():
+            print(f"{module:<22} {_fmt(result)}  {', '.join(result[2]) if result else ''}")
+        return
+
+    print(f"{'':<22} {args.compare + ' (before)':>19}   {'working tree (after)':>19}")
+    print(f"{'entry point':<22} {'wall ms':>9} {'cumul ms':>9}   {'wall ms':>9} {'cumul ms':>9}"
+          f"  heavy modules no longer loaded")
+    for module, result in after.items():
+        old = before[module]
+        dropped = sorted(set(old[2]) - set(result[2])) if old and result else []
+        print(f"{module:<22} {_fmt(old)}   {_fmt(result)}  {', '.join(dropped)}")
+
+
+if __name__ == "__main__":
+    main()
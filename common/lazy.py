@@ -0,0 +1,26 @@
+"""Lazy package exports (PEP 562), so importing a package costs nothing.
+
+    __getattr__, __dir__ = lazy_exports(__name__, {"OTPManager": "vicky.otp_email"})
+
+`from vicky import OTPManager` then imports vicky.otp_email on first access
+only, and the heavy dependencies (OpenCV, numpy, requests) with it.
+"""
+import importlib
+
+
+def lazy_exports(package, exports):
+    """Return the module-level (__getattr__, __dir__) pair for `package`"""
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name):
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module), name)
+        namespace[name] = value     # later lookups skip __getattr__
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
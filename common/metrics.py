@@ -0,0 +1,527 @@
+"""Counters, latency histograms and timing spans shared by the photo, OCR and OTP code.
+
+Off by default: every counter/histogram update and span is then one global
+check and a return. Turn it on with KYC_METRICS=1 in the environment or
+metrics.enable(); KYC_METRICS_OUT=path also writes a JSON snapshot at exit.
+When on, a span costs about 1 µs and a counter update a few hundred ns,
+a fixed cost per call that python -m common.bench_metrics bounds on every
+hot path (the in-memory OTP round, 2-4 µs, is the most instrumented).
+
+    from common import metrics
+
+    REQUESTS = metrics.counter("kyc_ocr_requests_total", "OCR requests by status", ["status"])
+    REQUESTS.inc("200")
+
+    with metrics.span("ocr.upload"):        # kyc_span_seconds{span="ocr.upload"}
+        ...
+    metrics.record("liveness.haar_face", seconds)   # a span the caller timed itself
+    metrics.annotate("ocr.field.name", seconds)     # the open trace only, no histogram
+
+    print(metrics.prometheus_text())        # Prometheus text exposition format
+    metrics.snapshot()                      # the same as a JSON-ready dict
+    metrics.serve(9100)                     # /metrics and /metrics.json on a thread
+
+Single requests can be looked at in detail, whether or not metrics are on:
+
+    with metrics.trace("onboarding") as t:  # every span inside, in order
+        ...
+    print(t.report())
+    with metrics.profile() as p:            # cProfile
+        ...
+    print(p.text)
+    with metrics.sample() as s:             # stack sampling, low overhead
+        ...
+    print(s.folded())                       # flamegraph.pl / speedscope input
+
+Traces follow the context: spans recorded on the calling thread or in its
+asyncio tasks are collected, spans on other threads or processes are not.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import get_ident
+
+# Seconds, from 10 µs (an OTP check) to 30 s (a slow OCR upload)
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = False
+_tracing = 0            # traces open anywhere; spans are timed while > 0
+_tracing_lock = threading.Lock()
+_registry = {}
+_registry_lock = threading.Lock()
+_trace = contextvars.ContextVar("kyc_trace", default=None)
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+def active():
+    """True when spans are being timed (metrics on or a trace open); guards costly labels"""
+    return _enabled or _tracing > 0
+
+
+def tracing():
+    """True when a trace is open somewhere; guards detail only worth timing per request"""
+    return _tracing > 0
+
+
+class _Metric:
+    """Values live in one dict per writing thread, merged when exported.
+
+    Only the owning thread writes its shard, so an update takes no lock (a
+    lock alone costs more than the rest of an update); exporters copy each
+    shard, which the GIL makes atomic.
+    """
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._shards = {}       # thread id -> {label values tuple: value}
+
+    def _shard(self):
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards.setdefault(get_ident(), {})
+        return shard
+
+    def _labels(self, values):
+        return dict(zip(self.labelnames, values))
+
+    def reset(self):
+        self._shards = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not _enabled:
+            return
+        shard = self._shards.get(get_ident()) or self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        merged = {}
+        for shard in list(self._shards.values()):
+            for key, value in shard.copy().items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def value(self, *labels):
+        return self.values().get(labels, 0)
+
+    def snapshot(self):
+        return [{"labels": self._labels(k), "value": v} for k, v in self.values().items()]
+
+    def exposition(self):
+        return [f"{self.name}{_format_labels(self._labels(k))} {_number(v)}"
+                for k, v in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not _enabled:
+            return
+        shard = self._shards.get(get_ident()) or self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0, value]
+        # First bound >= value, i.e. the "le" bucket; len(buckets) is +Inf
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+        if value > entry[3]:
+            entry[3] = value
+
+    def values(self):
+        """{label values: (bucket counts, sum, count, max)} over all threads"""
+        merged = {}
+        for shard in list(self._shards.values()):
+            for key, (counts, total, count, largest) in shard.copy().items():
+                if key in merged:
+                    m_counts, m_total, m_count, m_largest = merged[key]
+                    merged[key] = ([a + b for a, b in zip(m_counts, counts)], m_total + total,
+                                   m_count + count, max(m_largest, largest))
+                else:
+                    merged[key] = (list(counts), total, count, largest)
+        return merged
+
+    def quantile(self, q, counts, largest):
+        """Estimate a quantile from bucket counts, interpolating inside the bucket"""
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                low = self.buckets[i - 1] if i else 0.0
+                high = min(self.buckets[i] if i < len(self.buckets) else largest, largest)
+                return low + max(0.0, high - low) * (rank - seen) / count
+            seen += count
+        return largest
+
+    def _summary(self, counts, total, count, largest):
+        if not count:
+            return {"count": 0, "sum": 0.0, "mean": None, "max": None, "p50": None, "p95": None,
+                    "p99": None}
+        return {"count": count, "sum": total, "mean": total / count, "max": largest,
+                "p50": self.quantile(0.5, counts, largest), "p95": self.quantile(0.95, counts, largest),
+                "p99": self.quantile(0.99, counts, largest)}
+
+    def summary(self, *labels):
+        """{count, sum, mean, max, p50, p95, p99} for one label set, in seconds"""
+        return self._summary(*self.values().get(labels, ([], 0.0, 0, None)))
+
+    def snapshot(self):
+        result = []
+        for key, (counts, total, count, largest) in self.values().items():
+            cumulative, buckets = 0, {}
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                buckets[_number(bound)] = cumulative
+            result.append(dict(self._summary(counts, total, count, largest),
+                               labels=self._labels(key), buckets=buckets))
+        return result
+
+    def exposition(self):
+        lines = []
+        for key, (counts, total, count, _) in sorted(self.values().items()):
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=_number(bound)))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def _register(cls, name, help, labels, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help, labels, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered differently")
+        return metric
+
+
+def counter(name, help, labels=()):
+    """Get or create the counter `name`"""
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    """Get or create the histogram `name`"""
+    return _register(Histogram, name, help, labels, buckets=buckets)
+
+
+def reset():
+    """Zero every metric (benchmarks, tests)"""
+    for metric in list(_registry.values()):
+        metric.reset()
+
+
+# Spans and traces
+
+SPAN_SECONDS = histogram("kyc_span_seconds", "Duration of instrumented code spans", ["span"])
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []         # (name, start offset, duration) in seconds, by end time
+
+    def add(self, name, seconds):
+        end = time.perf_counter() - self.started
+        self.spans.append((name, end - seconds, seconds))
+
+    def as_dict(self):
+        return {"name": self.name, "spans": [
+            {"span": name, "start_ms": round(start * 1000, 3), "ms": round(seconds * 1000, 3)}
+            for name, start, seconds in sorted(self.spans, key=lambda s: s[1])]}
+
+    def report(self):
+        lines = [f"Trace {self.name}:"]
+        for span in self.as_dict()["spans"]:
+            lines.append(f"  {span['start_ms']:>10.3f} ms  {span['ms']:>10.3f} ms  {span['span']}")
+        return "\n".join(lines)
+
+
+def record(name, seconds):
+    """Record a span the caller timed itself"""
+    if _enabled:
+        SPAN_SECONDS.observe(seconds, name)
+    if _tracing:
+        annotate(name, seconds)
+
+
+def annotate(name, seconds):
+    """Add a span to the open trace only, leaving the histograms alone"""
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager timing its block as the span `name`"""
+    return _Span(name) if _enabled or _tracing else _NO_SPAN
+
+
+def timed(name):
+    """Decorator timing every call of the function as the span `name`"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not (_enabled or _tracing):
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def trace(name="request"):
+    """Collect every span recorded in this context while the block runs"""
+    global _tracing
+    current = Trace(name)
+    token = _trace.set(current)
+    # Traces open and close on many threads; += is not atomic
+    with _tracing_lock:
+        _tracing += 1
+    try:
+        yield current
+    finally:
+        with _tracing_lock:
+            _tracing -= 1
+        _trace.reset(token)
+
+
+# Profiling hooks
+
+class Profile:
+    def __init__(self, sort, limit):
+        # Imported here: every module imports metrics, few ever profile
+        import cProfile
+
+        self.sort = sort
+        self.limit = limit
+        self.profiler = cProfile.Profile()
+        self.text = ""
+
+    def finish(self, path=None):
+        import io
+        import pstats
+
+        if path:
+            self.profiler.dump_stats(path)     # for snakeviz / pstats
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(self.sort).print_stats(self.limit)
+        self.text = out.getvalue()
+
+
+@contextmanager
+def profile(sort="cumulative", limit=25, path=None):
+    """cProfile the block; the report is in .text afterwards (and in `path` as .prof)"""
+    result = Profile(sort, limit)
+    result.profiler.enable()
+    try:
+        yield result
+    finally:
+        result.profiler.disable()
+        result.finish(path)
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of one thread every `interval` seconds"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}        # "outer;...;inner" -> samples
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def folded(self):
+        """One "stack count" line per distinct stack (flamegraph.pl folded format)"""
+        return "\n".join(f"{stack} {count}" for stack, count in
+                         sorted(self.stacks.items(), key=lambda item: -item[1]))
+
+    def top(self, n=15):
+        """Innermost functions by share of samples"""
+        leaves = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        ranked = sorted(leaves.items(), key=lambda item: -item[1])[:n]
+        return [(leaf, count / max(self.samples, 1)) for leaf, count in ranked]
+
+
+@contextmanager
+def sample(interval=0.005):
+    """Sample the calling thread's stack while the block runs"""
+    sampler = Sampler(threading.get_ident(), interval)
+    sampler.start()
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+
+
+# Export
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.exposition())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Every metric as a JSON-ready dict; histograms include estimated p50/p95/p99"""
+    return {"enabled": _enabled, "timestamp": time.time(),
+            "metrics": {name: {"type": metric.kind, "help": metric.help, "values": metric.snapshot()}
+                        for name, metric in sorted(_registry.items())}}
+
+
+def write_snapshot(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def report():
+    """Span latencies as a short table, for printing at the end of a script"""
+    lines = [f"{'span':<28} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for (name,), values in sorted(SPAN_SECONDS.values().items()):
+        s = SPAN_SECONDS._summary(*values)
+        lines.append(f"{name:<28} {s['count']:>7} {s['mean'] * 1000:>9.3f} {s['p50'] * 1000:>9.3f} "
+                     f"{s['p95'] * 1000:>9.3f} {s['p99'] * 1000:>9.3f}")
+    return "\n".join(lines)
+
+
+def serve(port=9100, host="127.0.0.1"):
+    """Serve /metrics and /metrics.json on a background thread; call .shutdown() when done"""
+    # http.server pulls in email, ssl and more; only load it when serving
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, kind = prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, kind = json.dumps(snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if os.environ.get("KYC_METRICS") == "1":
+    enable()
+    if os.environ.get("KYC_METRICS_OUT"):
+        atexit.register(write_snapshot, os.environ["KYC_METRICS_OUT"])
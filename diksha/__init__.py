@@ -0,0 +1,19 @@
+"""Selfie capture and liveness checks.
+
+Importing the package loads nothing; OpenCV and numpy are imported with the
+first class that needs them (`from diksha import LivenessDetector`).
+"""
+from common.lazy import lazy_exports
+
+__all__ = ["LivenessDetector", "CircleCompositor", "FrameGrabber", "PhotoEncoder",
+           "FaceTrackPipeline", "BlinkTracker", "StreamingLivenessEngine"]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "LivenessDetector": "diksha.detector",
+    "CircleCompositor": "diksha.compositor",
+    "FrameGrabber": "diksha.capture",
+    "PhotoEncoder": "diksha.capture",
+    "FaceTrackPipeline": "diksha.face_tracker",
+    "BlinkTracker": "diksha.liveness_stream",
+    "StreamingLivenessEngine": "diksha.liveness_stream",
+})
@@ -0,0 +1,202 @@
+"""Offline liveness re-scoring of stored selfies and short clips.
+
+    python -m diksha.batch_score ./captures --out verdicts.jsonl
+    python -m diksha.batch_score manifest.txt --workers 8 --in-flight 32
+
+The input is a directory (scanned recursively) or a manifest file with one
+path per line (or JSONL lines with a "path" key). Items are scored on a
+process pool; every worker keeps one LivenessDetector, so the Haar cascades
+are loaded once per worker instead of once per item. Images use the same
+check as photo.py, clips use the blink tracker of the streaming engine.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from diksha.detector import LivenessDetector
+from diksha.liveness_stream import BlinkTracker
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+
+_detector = None        # one per worker process
+
+
+class LatencySample:
+    """Uniform reservoir of at most `size` latencies, for p50/p95 in flat memory.
+
+    Exact while fewer than `size` items have been added.
+    """
+
+    def __init__(self, size=10_000, seed=0):
+        self.size = size
+        self.count = 0
+        self.values = []
+        self._random = random.Random(seed)
+
+    def add(self, value):
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.size:
+                self.values[slot] = value
+
+    def percentile(self, pct):
+        values = sorted(self.values)
+        return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _init_worker():
+    global _detector
+    _detector = LivenessDetector()
+    _detector.cascades()    # pay the classifier load up front, once
+
+
+def _score_image(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        return {"live": None, "reason": "Unreadable image"}
+    verdict = _detector.check(frame)
+    verdict.pop("timings")
+    return verdict
+
+
+def _score_clip(path, frame_step, required_blinks):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {"live": None, "reason": "Unreadable video"}
+    tracker = BlinkTracker()
+    frames = analysed = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames += 1
+            if (frames - 1) % frame_step:
+                continue
+            analysed += 1
+            verdict = _detector.check(frame)
+            if verdict["face_box"] is None or not verdict["inside_circle"]:
+                continue
+            tracker.update(verdict["eye_count"] >= 1)
+            if tracker.blinks >= required_blinks:
+                break
+    finally:
+        cap.release()
+    live = tracker.blinks >= required_blinks
+    return {"live": live, "reason": f"{tracker.blinks} blink(s) detected" if live else "No blink detected",
+            "blinks": tracker.blinks, "frames": frames, "frames_analysed": analysed}
+
+
+def score_item(path, frame_step=2, required_blinks=1):
+    """Score one image or clip inside a worker; always returns a JSON-able dict"""
+    started = time.perf_counter()
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in VIDEO_EXTS:
+            result = _score_clip(path, frame_step, required_blinks)
+            result["kind"] = "clip"
+        else:
+            result = _score_image(path)
+            result["kind"] = "image"
+    except Exception as e:
+        result = {"live": None, "reason": f"Error: {e}", "kind": None}
+    result["path"] = path
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def iter_items(source):
+    """Yield media paths from a directory or a manifest file"""
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS | VIDEO_EXTS:
+                    yield os.path.join(root, name)
+        return
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line)["path"] if line.startswith("{") else line
+
+
+def run_batch(source, out, workers=None, in_flight=None, frame_step=2, required_blinks=1):
+    """Score everything in `source`, streaming one JSON line per item to `out`"""
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or workers * 4
+    latencies = LatencySample()
+    live = failed = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+
+        def drain(block):
+            nonlocal live, failed
+            done, rest = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                latencies.add(result["latency_ms"])
+                if result["live"]:
+                    live += 1
+                elif result["live"] is None:
+                    failed += 1
+            return rest
+
+        for path in iter_items(source):
+            # Bounded in-flight work keeps memory flat on huge datasets
+            while len(pending) >= in_flight:
+                pending = drain(block=True)
+            pending.add(pool.submit(score_item, path, frame_step, required_blinks))
+        while pending:
+            pending = drain(block=True)
+
+    elapsed = time.perf_counter() - started
+    return {"items": latencies.count, "live": live, "failed": failed, "elapsed": elapsed,
+            "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch liveness scoring")
+    parser.add_argument("source", help="directory of images/clips or manifest file")
+    parser.add_argument("--out", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--in-flight", type=int, default=None, help="max queued items")
+    parser.add_argument("--frame-step", type=int, default=2, help="analyse every Nth clip frame")
+    parser.add_argument("--blinks", type=int, default=1, help="blinks required for a LIVE clip")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        summary = run_batch(args.source, out, args.workers, args.in_flight,
+                            args.frame_step, args.blinks)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if not summary["items"]:
+        print("No items found", file=sys.stderr)
+        return
+    latencies = summary["latencies"]
+    print(f"Scored {summary['items']} items ({summary['live']} live, {summary['failed']} failed) "
+          f"in {summary['elapsed']:.2f}s", file=sys.stderr)
+    print(f"Throughput {summary['items'] / summary['elapsed']:.1f} items/sec   "
+          f"p50 {statistics.median(latencies.values):.1f} ms   p95 {latencies.percentile(95):.1f} ms",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
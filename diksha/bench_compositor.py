@@ -0,0 +1,69 @@
+"""Micro-benchmark: per-frame time and allocations of the circular mask.
+
+Compares the old `frame * mask + 255 * (1 - mask)` code from photo.py with
+CircleCompositor at 720p and 1080p.
+
+    python -m diksha.bench_compositor
+"""
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from diksha.compositor import CircleCompositor
+
+RESOLUTIONS = [(1280, 720), (1920, 1080)]
+FRAMES = 200
+
+
+def old_composite(frame, center, radius, count):
+    mask = np.zeros_like(frame, dtype=np.uint8)
+    cv2.circle(mask, center, radius, (1, 1, 1), -1)
+    out = frame * mask + 255 * (1 - mask)
+    cv2.drawMarker(out, center, color=(0, 0, 255), markerType=cv2.MARKER_CROSS,
+                   markerSize=20, thickness=2)
+    cv2.putText(out, str(count), (center[0] - 25, center[1] - 100),
+                cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 255), 5, cv2.LINE_AA)
+    return out
+
+
+def make_new_composite():
+    compositor = CircleCompositor()
+
+    def new_composite(frame, center, radius, count):
+        out = compositor.composite(frame, radius, center)
+        return compositor.draw_countdown(out, count, center)
+    return new_composite
+
+
+def measure(composite, frame, center, radius):
+    composite(frame, center, radius, 3)     # warm up caches and buffers
+    t0 = time.perf_counter()
+    for i in range(FRAMES):
+        composite(frame, center, radius, i % 3 + 1)
+    per_frame_ms = (time.perf_counter() - t0) * 1000 / FRAMES
+
+    tracemalloc.start()
+    for i in range(FRAMES):
+        composite(frame, center, radius, i % 3 + 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_frame_ms, peak
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for width, height in RESOLUTIONS:
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        center = (width // 2, height // 2)
+        radius = min(center) - 50
+        old_ms, old_peak = measure(old_composite, frame, center, radius)
+        new_ms, new_peak = measure(make_new_composite(), frame, center, radius)
+        print(f"{width}x{height}")
+        print(f"  before  {old_ms:6.2f} ms/frame   peak alloc {old_peak / 1e6:7.2f} MB")
+        print(f"  after   {new_ms:6.2f} ms/frame   peak alloc {new_peak / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Background frame grabbing and off-thread photo encoding.
+
+cap.read() returns the oldest frame in the driver's buffer, so reading once
+after a countdown gives a stale picture. FrameGrabber keeps reading on its own
+thread and always holds the newest decoded frame. PhotoEncoder encodes and
+writes the final photo on a worker thread in a selectable format, so the UI
+does not wait for PNG compression.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# Extension and cv2.imencode quality flag for each output format
+FORMATS = {
+    "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),      # 0 (fast) .. 9 (small)
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),        # 0 .. 100
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),       # 1 .. 100
+}
+DEFAULT_QUALITY = {"png": 3, "jpeg": 90, "webp": 90}
+
+
+class FrameGrabber:
+    def __init__(self, cap):
+        self.cap = cap
+        self._frame = None
+        self._stamp = 0.0
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.005)
+                continue
+            with self._cond:
+                self._frame = frame
+                self._stamp = time.perf_counter()
+                self._seq += 1
+                self._cond.notify_all()
+
+    def latest(self, after=0, timeout=2.0):
+        """Return (frame, seq, age_ms) for the newest frame with seq > `after`.
+
+        Returns (None, seq, None) if no such frame arrives within `timeout`.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after, timeout):
+                return None, self._seq, None
+            age_ms = (time.perf_counter() - self._stamp) * 1000
+            return self._frame, self._seq, age_ms
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+class PhotoEncoder:
+    def __init__(self, fmt="png", quality=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', use one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.quality = DEFAULT_QUALITY[fmt] if quality is None else quality
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photo-encoder")
+
+    def filename(self, stem):
+        return stem + FORMATS[self.fmt][0]
+
+    def _encode_and_write(self, path, image):
+        ext, flag = FORMATS[self.fmt]
+        t0 = time.perf_counter()
+        ok, data = cv2.imencode(ext, image, [flag, self.quality])
+        t1 = time.perf_counter()
+        if not ok:
+            raise RuntimeError(f"Failed to encode photo as {self.fmt}")
+        with open(path, "wb") as f:
+            f.write(data.tobytes())
+        t2 = time.perf_counter()
+        return {"path": path, "bytes": len(data),
+                "encode_ms": round((t1 - t0) * 1000, 1), "write_ms": round((t2 - t1) * 1000, 1)}
+
+    def save(self, stem, image):
+        """Encode and write `image` in the background; returns a Future with timings"""
+        # Copy so the caller can keep reusing its buffer
+        return self._pool.submit(self._encode_and_write, self.filename(stem), image.copy())
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,117 @@
+"""Reusable liveness check for a single frame or a batch of frames.
+
+The logic is the one photo.py has always used (face fully inside the circle,
+at least one eye in a face means LIVE) but without any webcam or window side
+effects, so a server process can keep one warm LivenessDetector and call it
+from many threads. cv2.CascadeClassifier is not safe to share between
+threads, so every thread lazily gets its own pair of classifiers.
+"""
+import threading
+import time
+
+import cv2
+
+from common import metrics
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE = 'haarcascade_eye.xml'
+
+
+def load_cascades():
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + FACE_CASCADE)
+    eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + EYE_CASCADE)
+    return face_cascade, eye_cascade
+
+
+CHECKS = metrics.counter("kyc_liveness_checks_total", "Liveness checks by verdict", ["verdict"])
+
+
+def default_circle(width, height):
+    """Circular area used by photo.py"""
+    center_x, center_y = width // 2, height // 2
+    return center_x, center_y, min(center_x, center_y) - 50
+
+
+def face_inside_circle(box, circle):
+    """Both corners of the face box must lie inside the circle"""
+    x, y, w, h = box
+    center_x, center_y, radius = circle
+    for (fx, fy) in ((x, y), (x + w, y + h)):
+        if (fx - center_x)**2 + (fy - center_y)**2 > radius**2:
+            return False
+    return True
+
+
+class LivenessDetector:
+    def __init__(self, circle=None, scale_factor=1.3, min_neighbors=5, equalize=True):
+        self.circle = circle            # None: derive from each frame's size
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.equalize = equalize
+        self._local = threading.local()
+
+    def cascades(self):
+        """(face, eye) classifiers owned by the calling thread, loaded on first use"""
+        local = self._local
+        if not hasattr(local, "cascades"):
+            local.cascades = load_cascades()
+        return local.cascades
+
+    def check(self, frame):
+        """Run the liveness check on one BGR (or gray) frame and return a verdict dict"""
+        started = time.perf_counter()
+        face_cascade, eye_cascade = self.cascades()
+        height, width = frame.shape[:2]
+        circle = self.circle or default_circle(width, height)
+
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.equalize:
+            gray = cv2.equalizeHist(gray)
+        t_pre = time.perf_counter()
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors)
+        t_face = time.perf_counter()
+
+        verdict = {"live": False, "reason": None, "face_box": None,
+                   "inside_circle": False, "eye_count": 0, "faces": len(faces)}
+        if len(faces) == 0:
+            verdict["reason"] = "No face detected"
+        else:
+            verdict["inside_circle"] = True
+            for (x, y, w, h) in faces:
+                box = (int(x), int(y), int(w), int(h))
+                if verdict["face_box"] is None:
+                    verdict["face_box"] = box
+                if not face_inside_circle(box, circle):
+                    verdict["inside_circle"] = False
+                    verdict["face_box"] = box
+                    break
+                eyes = eye_cascade.detectMultiScale(gray[y:y+h, x:x+w])
+                if len(eyes) > verdict["eye_count"]:
+                    verdict["eye_count"] = len(eyes)
+                    verdict["face_box"] = box
+
+            if not verdict["inside_circle"]:
+                verdict["reason"] = "User outside circular area"
+            elif verdict["eye_count"] >= 1:
+                verdict["live"] = True
+                verdict["reason"] = "Eyes detected"
+            else:
+                verdict["reason"] = "No eyes detected"
+        done = time.perf_counter()
+
+        metrics.record("liveness.preprocess", t_pre - started)
+        metrics.record("liveness.haar_face", t_face - t_pre)
+        metrics.record("liveness.haar_eyes", done - t_face)
+        CHECKS.inc("live" if verdict["live"] else "fake")
+        verdict["timings"] = {
+            "preprocess_ms": round((t_pre - started) * 1000, 3),
+            "face_ms": round((t_face - t_pre) * 1000, 3),
+            "eyes_ms": round((done - t_face) * 1000, 3),
+            "total_ms": round((done - started) * 1000, 3),
+        }
+        return verdict
+
+    def check_batch(self, frames):
+        """Check several frames in one call, reusing this thread's classifiers"""
+        return [self.check(frame) for frame in frames]
@@ -0,0 +1,106 @@
+"""Detect-then-track face pipeline for continuous-frame mode.
+
+Full Haar detection is expensive and only the inscribed circle can hold a valid
+face, so detection runs on the circle's bounding box, downscaled by a pyramid
+level, and only every `detect_every` frames. In between, the face box is
+followed with Lucas-Kanade optical flow and eye detection runs inside the
+tracked box only.
+"""
+import cv2
+import numpy as np
+
+
+def full_frame_detect(gray, face_cascade, eye_cascade):
+    """Baseline used by photo.py: full-frame face detection, eyes in every face"""
+    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+    if len(faces) == 0:
+        return None, 0
+    box = tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+    x, y, w, h = box
+    eyes = eye_cascade.detectMultiScale(gray[y:y+h, x:x+w])
+    return box, len(eyes)
+
+
+class FaceTrackPipeline:
+    def __init__(self, face_cascade, eye_cascade, circle, frame_size,
+                 detect_every=5, pyramid_level=1, min_points=6):
+        self.face_cascade = face_cascade
+        self.eye_cascade = eye_cascade
+        self.width, self.height = frame_size
+        center_x, center_y, radius = circle
+        # Bounding box of the circle, clamped to the frame
+        self.roi = (max(center_x - radius, 0), max(center_y - radius, 0),
+                    min(center_x + radius, self.width), min(center_y + radius, self.height))
+        self.detect_every = max(1, detect_every)
+        self.pyramid_level = pyramid_level
+        self.min_points = min_points
+        self.box = None
+        self.points = None
+        self._prev_gray = None
+        self._since_detect = 0
+        self.stats = {"detections": 0, "tracked": 0, "lost": 0}
+
+    def _detect(self, gray):
+        x0, y0, x1, y1 = self.roi
+        small = gray[y0:y1, x0:x1]
+        for _ in range(self.pyramid_level):
+            small = cv2.pyrDown(small)
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=1.3, minNeighbors=5)
+        self.stats["detections"] += 1
+        if len(faces) == 0:
+            return None
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        scale = 2 ** self.pyramid_level
+        return (int(x0 + fx * scale), int(y0 + fy * scale), int(fw * scale), int(fh * scale))
+
+    def _seed_points(self, gray):
+        x, y, w, h = self.box
+        mask = np.zeros_like(gray)
+        mask[y:y+h, x:x+w] = 255
+        self.points = cv2.goodFeaturesToTrack(gray, maxCorners=40, qualityLevel=0.01,
+                                              minDistance=5, mask=mask)
+
+    def _track(self, gray):
+        if self.points is None or len(self.points) < self.min_points:
+            return None
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self.points, None)
+        good = status.reshape(-1) == 1
+        if good.sum() < self.min_points:
+            return None
+        shift = np.median(new_points[good] - self.points[good], axis=0).reshape(-1)
+        self.points = new_points[good].reshape(-1, 1, 2)
+        x, y, w, h = self.box
+        x = int(round(x + shift[0]))
+        y = int(round(y + shift[1]))
+        if x < 0 or y < 0 or x + w > self.width or y + h > self.height:
+            return None
+        self.stats["tracked"] += 1
+        return (x, y, w, h)
+
+    def process(self, gray):
+        """Return (face_box or None, eye_count) for one equalized gray frame"""
+        box = None
+        if self.box is not None and self._since_detect < self.detect_every - 1:
+            box = self._track(gray)
+            if box is None:
+                self.stats["lost"] += 1
+            self._since_detect += 1
+        if box is None:
+            box = self._detect(gray)
+            self._since_detect = 0
+            self.box = box
+            if box is not None:
+                self._seed_points(gray)
+        else:
+            self.box = box
+
+        if self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            self._prev_gray = gray.copy()
+        else:
+            np.copyto(self._prev_gray, gray)
+
+        if box is None:
+            return None, 0
+        x, y, w, h = box
+        eyes = self.eye_cascade.detectMultiScale(gray[y:y+h, x:x+w])
+        return box, len(eyes)
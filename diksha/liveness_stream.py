@@ -0,0 +1,345 @@
+"""Streaming liveness engine.
+
+Instead of judging a single captured frame, frames are pushed into a fixed-size
+ring buffer and analysed on a worker thread. Eye presence is tracked over time
+and the user is only declared LIVE after a real blink (eyes open -> closed ->
+open) inside the circular area, which a printed photo cannot fake.
+
+Run from the repository root:
+    python -m diksha.liveness_stream                  # webcam 0
+    python -m diksha.liveness_stream --video clip.mp4 --no-preview
+    python -m diksha.liveness_stream --frames ./frames --no-preview
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from diksha.detector import LivenessDetector, default_circle, face_inside_circle
+from diksha.face_tracker import FaceTrackPipeline, full_frame_detect
+
+
+# ---------------- Frame sources -----------------
+class WebcamSource:
+    """Live frames from a camera device"""
+    realtime = True
+
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open webcam {index}")
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(WebcamSource):
+    """Frames decoded from a video file (headless testing)"""
+    realtime = False
+
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open video '{path}'")
+
+
+class DirectorySource:
+    """Frames read from a directory of images, in file name order"""
+    realtime = False
+
+    def __init__(self, path, patterns=("*.png", "*.jpg", "*.jpeg", "*.bmp")):
+        self.files = sorted(f for p in patterns for f in glob.glob(os.path.join(path, p)))
+        if not self.files:
+            raise RuntimeError(f"No frames found in '{path}'")
+        self._next = 0
+
+    def read(self):
+        while self._next < len(self.files):
+            frame = cv2.imread(self.files[self._next])
+            self._next += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self._next = len(self.files)
+
+
+# ---------------- Ring buffer -----------------
+class FrameRing:
+    """Fixed-size ring of frame slots shared by the reader and the worker.
+
+    Slots are allocated once and reused with np.copyto, so steady-state pushes
+    do not allocate. When the worker falls behind, push() either overwrites the
+    oldest unread frame (live sources) or blocks until a slot frees up
+    (file sources, so every frame gets analysed).
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._stamps = [0.0] * capacity
+        self._write = 0     # total frames pushed
+        self._read = 0      # total frames popped or dropped
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def push(self, frame, block=False):
+        with self._cond:
+            while block and self._write - self._read >= self.capacity and not self._closed:
+                self._cond.wait()
+            if self._write - self._read >= self.capacity:
+                self._read += 1
+                self.dropped += 1
+            idx = self._write % self.capacity
+            slot = self._slots[idx]
+            if slot is not None and slot.shape == frame.shape and slot.dtype == frame.dtype:
+                np.copyto(slot, frame)
+            else:
+                self._slots[idx] = frame.copy()
+            self._stamps[idx] = time.perf_counter()
+            self._write += 1
+            self._cond.notify_all()
+
+    def pop(self, out=None, timeout=None):
+        """Copy the oldest unread frame into `out` and return (frame, timestamp).
+
+        Returns None on timeout or when the ring is closed and drained.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._write > self._read or self._closed, timeout):
+                return None
+            if self._write == self._read:
+                return None
+            idx = self._read % self.capacity
+            slot = self._slots[idx]
+            if out is None or out.shape != slot.shape or out.dtype != slot.dtype:
+                out = slot.copy()
+            else:
+                np.copyto(out, slot)
+            stamp = self._stamps[idx]
+            self._read += 1
+            self._cond.notify_all()
+            return out, stamp
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+# ---------------- Blink tracking -----------------
+class BlinkTracker:
+    """Counts open -> closed -> open eye transitions.
+
+    A closed run shorter than `min_closed` frames is treated as detector noise
+    and one longer than `max_closed` frames is not a blink (eyes simply not
+    found), so neither counts.
+    """
+
+    def __init__(self, min_closed=1, max_closed=8):
+        self.min_closed = min_closed
+        self.max_closed = max_closed
+        self.state = None       # None until eyes are first seen open
+        self.closed_run = 0
+        self.blinks = 0
+
+    def update(self, eyes_open):
+        if eyes_open:
+            if self.state == "closed" and self.min_closed <= self.closed_run <= self.max_closed:
+                self.blinks += 1
+            self.state = "open"
+            self.closed_run = 0
+        elif self.state is not None:
+            self.state = "closed"
+            self.closed_run += 1
+
+
+# ---------------- Engine -----------------
+class StreamingLivenessEngine:
+    def __init__(self, source, circle=None, buffer_size=8, required_blinks=1,
+                 latency_budget=6.0, min_closed=1, max_closed=8,
+                 detect_every=1, pyramid_level=0, detector=None, max_read_failures=100):
+        self.source = source
+        self.detector = detector or LivenessDetector()
+        self.circle = circle
+        self.ring = FrameRing(buffer_size)
+        self.required_blinks = required_blinks
+        self.latency_budget = latency_budget
+        # detect_every > 1 or a pyramid level switches to detect-then-track
+        self.detect_every = detect_every
+        self.pyramid_level = pyramid_level
+        # Consecutive failed reads before a realtime source is treated as dead
+        self.max_read_failures = max_read_failures
+        self.tracker = BlinkTracker(min_closed, max_closed)
+        self.verdict = None
+        self.error = None       # exception that stopped the worker, re-raised by run()
+        self.stats = {"frames_seen": 0, "frames_analysed": 0, "no_face": 0,
+                      "outside_circle": 0, "detect_ms_total": 0.0}
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def _decide(self, live, reason):
+        with self._lock:
+            if self.verdict is None:
+                self.verdict = {"live": live, "reason": reason}
+                self._done.set()
+
+    def _analyse(self, gray, detect):
+        box, eye_count = detect(gray)
+        if box is None:
+            self.stats["no_face"] += 1
+            return
+        if not face_inside_circle(box, self.circle):
+            self.stats["outside_circle"] += 1
+            return
+        self.tracker.update(eye_count >= 1)
+        if self.tracker.blinks >= self.required_blinks:
+            self._decide(True, f"{self.tracker.blinks} blink(s) detected")
+
+    def _worker(self):
+        detect = None
+        frame = gray = None
+        try:
+            # Classifiers belong to this thread, they are not safe to share
+            face_cascade, eye_cascade = self.detector.cascades()
+            while not self._done.is_set():
+                item = self.ring.pop(out=frame, timeout=0.05)
+                if item is None:
+                    if self.ring.closed:
+                        break
+                    continue
+                frame, _ = item
+                t0 = time.perf_counter()
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+                gray = cv2.equalizeHist(gray, dst=gray)
+                if detect is None:
+                    if self.detect_every > 1 or self.pyramid_level > 0:
+                        pipeline = FaceTrackPipeline(face_cascade, eye_cascade, self.circle,
+                                                     (gray.shape[1], gray.shape[0]),
+                                                     self.detect_every, self.pyramid_level)
+                        detect = pipeline.process
+                    else:
+                        detect = lambda g: full_frame_detect(g, face_cascade, eye_cascade)
+                self._analyse(gray, detect)
+                self.stats["detect_ms_total"] += (time.perf_counter() - t0) * 1000
+                self.stats["frames_analysed"] += 1
+        except Exception as e:
+            # A crash must not end up as a "No face detected" verdict
+            self.error = e
+        finally:
+            # Never leave the reader blocked on a full ring
+            self.ring.close()
+
+    def _fallback_reason(self):
+        s = self.stats
+        if s["frames_analysed"] == 0 or s["no_face"] == s["frames_analysed"]:
+            return "No face detected"
+        if s["outside_circle"] >= s["frames_analysed"] - s["no_face"]:
+            return "User outside circular area"
+        return "No blink detected"
+
+    def run(self, preview=False, window="Align Yourself"):
+        """Stream frames until a verdict is reached or the latency budget runs out.
+
+        Raises whatever stopped the worker (e.g. a cv2 error), and RuntimeError
+        when a camera keeps returning no frame, instead of a FAKE verdict.
+        """
+        started = time.perf_counter()
+        worker = threading.Thread(target=self._worker, daemon=True)
+        worker.start()
+        failures = 0
+        try:
+            while not self._done.is_set() and worker.is_alive():
+                if time.perf_counter() - started > self.latency_budget:
+                    break
+                ret, frame = self.source.read()
+                if not ret:
+                    if not self.source.realtime:
+                        break
+                    failures += 1
+                    if failures >= self.max_read_failures:
+                        raise RuntimeError(f"Camera returned no frame {failures} times in a row")
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                if self.circle is None:
+                    self.circle = default_circle(frame.shape[1], frame.shape[0])
+                self.stats["frames_seen"] += 1
+                self.ring.push(frame, block=not self.source.realtime)
+                if preview:
+                    center_x, center_y, radius = self.circle
+                    cv2.circle(frame, (center_x, center_y), radius, (0, 255, 0), 2)
+                    cv2.imshow(window, frame)
+                    cv2.waitKey(1)
+        finally:
+            self.ring.close()
+            # File sources: let the worker drain what is left in the ring
+            worker.join(max(0.0, self.latency_budget - (time.perf_counter() - started)) + 1.0)
+            self._done.set()
+            if preview:
+                cv2.destroyWindow(window)
+
+        if self.error is not None:
+            raise self.error
+        self._decide(False, self._fallback_reason())
+        result = dict(self.verdict)
+        result.update(self.stats)
+        result["blinks"] = self.tracker.blinks
+        result["dropped"] = self.ring.dropped
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming blink-based liveness check")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--camera", type=int, default=0, help="webcam index (default 0)")
+    group.add_argument("--video", help="video file to read frames from")
+    group.add_argument("--frames", help="directory of frame images")
+    parser.add_argument("--budget", type=float, default=6.0, help="latency budget in seconds")
+    parser.add_argument("--blinks", type=int, default=1, help="blinks required for LIVE")
+    parser.add_argument("--buffer", type=int, default=8, help="ring buffer size in frames")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="run full face detection every N frames, track in between")
+    parser.add_argument("--pyramid", type=int, default=0, help="pyramid level for face detection")
+    parser.add_argument("--no-preview", action="store_true")
+    args = parser.parse_args()
+
+    if args.video:
+        source = VideoFileSource(args.video)
+    elif args.frames:
+        source = DirectorySource(args.frames)
+    else:
+        source = WebcamSource(args.camera)
+
+    engine = StreamingLivenessEngine(source, buffer_size=args.buffer,
+                                     required_blinks=args.blinks, latency_budget=args.budget,
+                                     detect_every=args.detect_every, pyramid_level=args.pyramid)
+    try:
+        result = engine.run(preview=not args.no_preview)
+    finally:
+        source.release()
+
+    if result["live"]:
+        print(f"User is LIVE ✅ ({result['reason']}, {result['elapsed']}s)")
+    else:
+        print(f"{result['reason']} ❌ - FAKE ({result['elapsed']}s)")
+    print(f"Frames seen {result['frames_seen']}, analysed {result['frames_analysed']}, "
+          f"dropped {result['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
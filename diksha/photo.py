@@ -1,98 +1,109 @@
-import cv2
-import numpy as np
+# Run from the repository root: python -m diksha.photo
+import argparse
 import time
 
-# Load Haar cascades for liveliness
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-eye_cascade  = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-
-# Open webcam
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Failed to open webcam")
-    exit()
-
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-center_x, center_y = width // 2, height // 2
-radius = min(center_x, center_y) - 50  # circular area
-
-# Countdown 3…2…1
-for i in range(3, 0, -1):
-    ret, frame = cap.read()
-    if not ret:
-        continue
-    
-    # Circular mask
-    mask = np.zeros_like(frame, dtype=np.uint8)
-    cv2.circle(mask, (center_x, center_y), radius, (1,1,1), -1)
-    circular_frame = frame * mask + 255 * (1 - mask)
-
-    # Draw "+" at center
-    cv2.drawMarker(circular_frame, (center_x, center_y), color=(0,0,255), 
-                   markerType=cv2.MARKER_CROSS, markerSize=20, thickness=2)
-
-    # Show countdown number
-    cv2.putText(circular_frame, str(i), (center_x-25, center_y-100), 
-                cv2.FONT_HERSHEY_SIMPLEX, 3, (0,0,255), 5, cv2.LINE_AA)
-
-    cv2.imshow("Align Yourself", circular_frame)
-    cv2.waitKey(1000)  # wait 1 second per count
-
-# Capture photo after countdown
-ret, frame = cap.read()
-cap.release()
-if not ret:
-    print("Failed to capture frame")
+from common import metrics
+
+# Output format for the saved photo: "png", "jpeg" or "webp"
+PHOTO_FORMAT = "png"
+PHOTO_QUALITY = None    # None = format default (PNG level 3, JPEG/WebP 90)
+
+
+def capture_photo(camera=0, photo_format=PHOTO_FORMAT, quality=PHOTO_QUALITY):
+    """Countdown, capture, save and liveness-check one photo from the webcam"""
+    # OpenCV is loaded here, so importing this module (or --help) stays instant
+    import cv2
+
+    from diksha.capture import FrameGrabber, PhotoEncoder
+    from diksha.compositor import CircleCompositor
+    from diksha.detector import LivenessDetector
+
+    # Open webcam
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        print("Failed to open webcam")
+        return
+
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    center_x, center_y = width // 2, height // 2
+    radius = min(center_x, center_y) - 50  # circular area
+    compositor = CircleCompositor()  # mask is built once and reused for every frame
+    encoder = PhotoEncoder(photo_format, quality)
+    grabber = FrameGrabber(cap).start()  # always holds the newest frame
+
+    # Countdown 3…2…1
+    seq = 0
+    for i in range(3, 0, -1):
+        frame, seq, _ = grabber.latest(after=seq)
+        if frame is None:
+            continue
+
+        # Circular mask, "+" at center and countdown number, all in one reused buffer
+        circular_frame = compositor.composite(frame, radius, (center_x, center_y))
+        compositor.draw_countdown(circular_frame, i, (center_x, center_y))
+
+        cv2.imshow("Align Yourself", circular_frame)
+        cv2.waitKey(1000)  # wait 1 second per count
+
+    # Capture photo after countdown: the freshest frame, not a buffered one
+    t0 = time.perf_counter()
+    frame, seq, age_ms = grabber.latest(after=seq)
+    grabber.stop()
+    cap.release()
+    if frame is None:
+        print("Failed to capture frame")
+        cv2.destroyAllWindows()
+        return
+    t1 = time.perf_counter()
+
+    # Circular mask for final photo (without "+")
+    user_photo = compositor.composite(frame, radius, (center_x, center_y), buffer="photo")
+    t2 = time.perf_counter()
+
+    # Save photo in the background while it is being shown
+    saved = encoder.save("user", user_photo)
+    metrics.record("photo.capture", t1 - t0)
+    print(f"⏱ capture {(t1 - t0) * 1000:.1f} ms (frame age {age_ms:.1f} ms), "
+          f"mask {(t2 - t1) * 1000:.1f} ms")
+
+    # Show final photo for 5 seconds
+    cv2.imshow("Captured Photo", user_photo)
+    cv2.waitKey(5000)
     cv2.destroyAllWindows()
-    exit()
-
-# Circular mask for final photo (without "+")
-mask = np.zeros_like(frame, dtype=np.uint8)
-cv2.circle(mask, (center_x, center_y), radius, (1,1,1), -1)
-user_photo = frame * mask + 255 * (1 - mask)
-
-# Save photo
-photo_filename = "user.png"
-cv2.imwrite(photo_filename, user_photo)
-print(f"Photo saved as {photo_filename}")
-
-# Show final photo for 5 seconds
-cv2.imshow("Captured Photo", user_photo)
-cv2.waitKey(5000)
-cv2.destroyAllWindows()
-
-# ---------------- Liveliness Detection with Circle Check -----------------
-gray = cv2.cvtColor(user_photo, cv2.COLOR_BGR2GRAY)
-gray = cv2.equalizeHist(gray)
-faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
-
-if len(faces) == 0:
-    print("No face detected ❌ - FAKE")
-else:
-    liveliness_detected = False
-    outside_circle = False
-
-    for (x, y, w, h) in faces:
-        # Check if face is fully inside the circular area
-        face_corners = [(x, y), (x+w, y+h)]
-        for (fx, fy) in face_corners:
-            if (fx - center_x)**2 + (fy - center_y)**2 > radius**2:
-                outside_circle = True
-                break
-        if outside_circle:
-            break
-
-        # Check eyes for liveliness
-        face_roi = gray[y:y+h, x:x+w]
-        eyes = eye_cascade.detectMultiScale(face_roi)
-        if len(eyes) >= 1:
-            liveliness_detected = True
-
-    if outside_circle:
+
+    info = saved.result()
+    encoder.close()
+    print(f"Photo saved as {info['path']} ({info['bytes'] / 1024:.1f} KB, "
+          f"encode {info['encode_ms']} ms, write {info['write_ms']} ms)")
+
+    # ---------------- Liveliness Detection with Circle Check -----------------
+    # Haar cascades are loaded lazily by the detector on first use
+    detector = LivenessDetector(circle=(center_x, center_y, radius))
+    verdict = detector.check(user_photo)
+
+    if verdict["faces"] == 0:
+        print("No face detected ❌ - FAKE")
+    elif not verdict["inside_circle"]:
         print("User outside circular area ❌ - FAKE")
-    elif liveliness_detected:
+    elif verdict["live"]:
         print("User is LIVE ✅")
     else:
         print("User is FAKE ❌")
 
+    # KYC_METRICS=1 python -m diksha.photo shows where the time went
+    if metrics.enabled():
+        print(metrics.report())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture a selfie and check liveness")
+    parser.add_argument("--camera", type=int, default=0, help="webcam device index")
+    parser.add_argument("--format", default=PHOTO_FORMAT, choices=("png", "jpeg", "webp"))
+    parser.add_argument("--quality", type=int, default=PHOTO_QUALITY)
+    args = parser.parse_args(argv)
+    capture_photo(args.camera, args.format, args.quality)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Asyncio onboarding service combining the diksha, sunil and vicky stages."""
+from common.lazy import lazy_exports
+
+__all__ = ["OnboardingService", "OnboardingError", "SessionNotFound", "Overloaded", "StageTimeout",
+           "TooManyAttempts"]
+
+__getattr__, __dir__ = lazy_exports(__name__, dict.fromkeys(__all__, "kyc.service"))
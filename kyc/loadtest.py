@@ -0,0 +1,186 @@
+"""Load test for the onboarding service, fully local.
+
+    python -m kyc.loadtest --sessions 200 --concurrency 32
+    python -m kyc.loadtest --selfie face.jpg --aadhaar card.jpg --ocr-latency 1.0 --max-pending 8
+
+Starts the stub OCR server (sunil) and the stub SMTP server (vicky), and runs
+--sessions onboarding sessions, --concurrency at a time, through
+start -> verify_otp -> submit_documents. The OTP is read from the manager
+instead of a mailbox. Reports sessions/sec, per-stage latency percentiles
+and how many document checks were refused (Overloaded) or timed out, which
+is what to watch when tuning the worker counts, concurrency limits and
+timeouts. Fails if guessing the OTP does not fail the session and burn the OTP.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from common import metrics
+from kyc.service import OnboardingError, OnboardingService, Overloaded, StageTimeout, TooManyAttempts
+from sunil.ocr_backends import HTTPBackend
+from sunil.stub_ocr_server import start_stub_server as start_ocr_stub
+from vicky.otp_email import OTPManager
+from vicky.smtp_pool import SMTPPool
+from vicky.stub_smtp_server import start_stub_server as start_smtp_stub
+
+
+class InboxOTPManager(OTPManager):
+    """Keeps the last OTP issued per email, standing in for the user's mailbox"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.inbox = {}
+
+    def generate_otp(self, email, client_ip=None):
+        otp, message = super().generate_otp(email, client_ip)
+        if otp:
+            self.inbox[email] = otp
+        return otp, message
+
+
+def synthetic_jpeg(seed, size=(480, 640)):
+    """A noisy test image, so every request carries real JPEG bytes to decode"""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (*size, 3), dtype=np.uint8)
+    cv2.circle(image, (size[1] // 2, size[0] // 2), min(size) // 4, (200, 180, 160), -1)
+    ok, encoded = cv2.imencode(".jpg", image)
+    return encoded.tobytes()
+
+
+def read_or_make(path, seed):
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return synthetic_jpeg(seed)
+
+
+def percentiles_ms(latencies):
+    if len(latencies) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"p50 {cuts[49] * 1000:7.1f}  p95 {cuts[94] * 1000:7.1f}  p99 {cuts[98] * 1000:7.1f} ms"
+
+
+async def onboard(service, n, selfie, aadhaar, latencies, outcomes):
+    email = f"user{n}@example.com"
+    t0 = time.perf_counter()
+    session_id, message = await service.start(email, "127.0.0.1")
+    if session_id is None:
+        outcomes["refused"] += 1
+        return
+    t1 = time.perf_counter()
+    ok, message = await service.verify_otp(session_id, service.otp.inbox.pop(email))
+    if not ok:
+        outcomes["otp_failed"] += 1
+        return
+    t2 = time.perf_counter()
+    try:
+        result = await service.submit_documents(session_id, selfie, aadhaar)
+    except Overloaded:
+        outcomes["overloaded"] += 1
+        return
+    except StageTimeout:
+        outcomes["timeouts"] += 1
+        return
+    except OnboardingError:
+        outcomes["errors"] += 1
+        return
+    t3 = time.perf_counter()
+    latencies["start"].append(t1 - t0)
+    latencies["verify"].append(t2 - t1)
+    latencies["documents"].append(t3 - t2)
+    latencies["session"].append(t3 - t0)
+    outcomes["approved" if result["approved"] else "rejected"] += 1
+    if result["ocr_error"]:
+        outcomes["ocr_errors"] += 1
+
+
+async def guess_check(service):
+    """True if wrong OTPs fail the session and burn the OTP they were guessing"""
+    email = "guesser@example.com"
+    session_id, _ = await service.start(email, "127.0.0.1")
+    otp = service.otp.inbox.pop(email)
+    wrong = "000000" if otp != "000000" else "111111"
+    try:
+        for _ in range(service.otp.backend.max_attempts):
+            await service.verify_otp(session_id, wrong)
+    except TooManyAttempts:
+        return not service.otp.validate_otp(email, otp)[0]
+    return False
+
+
+async def run(args):
+    ocr = start_ocr_stub(latency=args.ocr_latency, max_rps=args.ocr_max_rps)
+    smtp = start_smtp_stub(handshake=0.05, auth=0.05, latency=0.002)
+    mailer = SMTPPool(*smtp.server_address[:2], "kyc@example.com", "secret", starttls=False)
+    backend = HTTPBackend("helloworld", ocr.url, pool_size=args.ocr_concurrency)
+    selfie = read_or_make(args.selfie, 1)
+    aadhaar = read_or_make(args.aadhaar, 2)
+
+    latencies = {"start": [], "verify": [], "documents": [], "session": []}
+    outcomes = dict.fromkeys(("approved", "rejected", "overloaded", "timeouts", "refused",
+                              "otp_failed", "errors", "ocr_errors"), 0)
+    service = OnboardingService(backend, mailer, otp_manager=InboxOTPManager(cooldown_time=0),
+                                liveness_workers=args.workers, ocr_concurrency=args.ocr_concurrency,
+                                max_pending=args.max_pending,
+                                timeouts={"liveness": args.timeout, "ocr": args.timeout,
+                                          "documents": args.timeout + 1})
+    try:
+        async with service:
+            # Start the worker processes before the clock runs
+            await service._liveness(selfie)
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def one(n):
+                async with gate:
+                    await onboard(service, n, selfie, aadhaar, latencies, outcomes)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(n) for n in range(args.sessions)))
+            elapsed = time.perf_counter() - t0
+            service.delivery.join()
+            stats = service.stats()
+            locked_out = await guess_check(service)
+    finally:
+        mailer.close()
+        ocr.shutdown()
+        smtp.shutdown()
+
+    completed = len(latencies["session"])
+    print(f"{args.sessions} sessions, {args.concurrency} concurrent: {completed} completed in "
+          f"{elapsed:.2f}s ({completed / elapsed:.1f} sessions/sec)")
+    for stage, values in latencies.items():
+        print(f"  {stage:<10} {percentiles_ms(values)}")
+    print("  outcomes   " + ", ".join(f"{k} {v}" for k, v in outcomes.items()))
+    print(f"  delivery   {stats['delivery']}")
+    print(f"  stubs      OCR requests {ocr.requests} (throttled {ocr.throttled}), "
+          f"SMTP {smtp.counters}")
+    # With KYC_METRICS=1
+    if metrics.enabled():
+        print(metrics.report())
+    if not locked_out:
+        raise SystemExit("❌ Guessing the OTP did not fail the session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KYC onboarding load test")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--selfie", default=None, help="selfie image (default: synthetic)")
+    parser.add_argument("--aadhaar", default=None, help="Aadhaar image (default: synthetic)")
+    parser.add_argument("--workers", type=int, default=None, help="liveness worker processes")
+    parser.add_argument("--ocr-concurrency", type=int, default=8)
+    parser.add_argument("--ocr-latency", type=float, default=0.2, help="stub OCR seconds per request")
+    parser.add_argument("--ocr-max-rps", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-stage timeout in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""JSON-over-HTTP front end for the onboarding service, on plain asyncio streams.
+
+    POST /sessions                  {"email": ...}                 -> {"session", "message"}
+    POST /sessions/<id>/otp         {"otp": "123456"}              -> {"verified", "message"}
+                                    (429 once the session has had too many wrong OTPs)
+    POST /sessions/<id>/documents   {"selfie": b64, "aadhaar": b64} -> approval result
+    GET  /stats
+    GET  /metrics                   Prometheus text format (/metrics.json: JSON snapshot)
+
+Metrics are collected with KYC_METRICS=1 (see common.metrics). A request
+sent with "X-Trace: 1" gets the spans it went through back under "trace";
+one with "X-Profile: 1" gets a cProfile report under "profile", which covers
+everything the event loop ran meanwhile, so use it on an otherwise idle
+server.
+
+Run it fully locally against the stub OCR and SMTP servers:
+
+    python -m kyc.server --port 8080 --stubs
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import contextlib
+import json
+
+from common import metrics
+from kyc.service import OnboardingError, OnboardingService
+from sunil.ocr_backends import HTTPBackend
+from vicky.otp_email import OTPManager
+from vicky.rate_limit import default_rate_limiter
+
+MAX_BODY = 10 * 2**20
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _decode_image(body, name):
+    try:
+        return base64.b64decode(body[name], validate=True)
+    except (KeyError, TypeError, binascii.Error):
+        raise HTTPError(400, f"'{name}' must be a base64-encoded image")
+
+
+async def route(service, method, path, body, client_ip):
+    parts = path.strip("/").split("/")
+    if method == "GET" and parts == ["stats"]:
+        return 200, service.stats()
+    if method == "GET" and parts == ["metrics"]:
+        return 200, metrics.prometheus_text()
+    if method == "GET" and parts == ["metrics.json"]:
+        return 200, metrics.snapshot()
+    if method != "POST" or parts[0] != "sessions":
+        raise HTTPError(404, "Not found")
+    if len(parts) == 1:
+        if not isinstance(body.get("email"), str):
+            raise HTTPError(400, "'email' is required")
+        session_id, message = await service.start(body["email"], client_ip)
+        return (201 if session_id else 429), {"session": session_id, "message": message}
+    if len(parts) == 3 and parts[2] == "otp":
+        verified, message = await service.verify_otp(parts[1], str(body.get("otp", "")))
+        return 200, {"verified": verified, "message": message}
+    if len(parts) == 3 and parts[2] == "documents":
+        selfie, aadhaar = _decode_image(body, "selfie"), _decode_image(body, "aadhaar")
+        return 200, await service.submit_documents(parts[1], selfie, aadhaar)
+    raise HTTPError(404, "Not found")
+
+
+async def inspect(service, method, path, body, client_ip, headers):
+    """route(), with the trace and/or profile of the request added when asked for"""
+    want_trace, want_profile = headers.get("x-trace") == "1", headers.get("x-profile") == "1"
+    if not (want_trace or want_profile):
+        return await route(service, method, path, body, client_ip)
+    with metrics.trace(f"{method} {path}") as trace, contextlib.ExitStack() as stack:
+        profile = stack.enter_context(metrics.profile(limit=40)) if want_profile else None
+        status, payload = await route(service, method, path, body, client_ip)
+    if isinstance(payload, dict):
+        payload = dict(payload)     # may be the session's stored result
+        if want_trace:
+            payload["trace"] = trace.as_dict()
+        if profile is not None:
+            payload["profile"] = profile.text
+    return status, payload
+
+
+async def handle(service, reader, writer):
+    client_ip = (writer.get_extra_info("peername") or ("",))[0]
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            try:
+                if length > MAX_BODY:
+                    raise HTTPError(413, "Request body too large")
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    raise HTTPError(400, "Body must be JSON")
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "Body must be a JSON object")
+                status, payload = await inspect(service, method, path, body, client_ip, headers)
+            except (HTTPError, OnboardingError) as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            if isinstance(payload, str):
+                data, kind = payload.encode(), "text/plain; version=0.0.4"
+            else:
+                data, kind = json.dumps(payload).encode(), "application/json"
+            keep_alive = headers.get("connection", "").lower() != "close" and status != 413
+            writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                         f"Content-Type: {kind}\r\nContent-Length: {len(data)}\r\n"
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    """Serve until cancelled; returns the asyncio Server once listening"""
+    return await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+
+
+async def run(args):
+    stubs = []
+    ocr_url, mailer = args.ocr_url, None
+    if args.stubs:
+        from sunil.stub_ocr_server import start_stub_server as start_ocr_stub
+        from vicky.smtp_pool import SMTPPool
+        from vicky.stub_smtp_server import start_stub_server as start_smtp_stub
+
+        ocr = start_ocr_stub(latency=0.2)
+        smtp = start_smtp_stub(handshake=0.05, auth=0.05)
+        stubs = [ocr, smtp]
+        ocr_url = ocr.url
+        mailer = SMTPPool(*smtp.server_address[:2], "kyc@example.com", "secret", starttls=False)
+        print(f"Stub OCR on {ocr.url}, stub SMTP on port {smtp.server_address[1]}")
+
+    backend = HTTPBackend(args.api_key, ocr_url, pool_size=args.ocr_concurrency)
+    otp_manager = OTPManager(rate_limiter=default_rate_limiter())
+    async with OnboardingService(backend, mailer, otp_manager, ocr_concurrency=args.ocr_concurrency,
+                                 liveness_workers=args.workers, max_pending=args.max_pending) as service:
+        server = await serve(service, args.host, args.port)
+        print(f"KYC onboarding service on http://{args.host}:{args.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for stub in stubs:
+                stub.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KYC onboarding service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--stubs", action="store_true", help="use local stub OCR and SMTP servers")
+    parser.add_argument("--ocr-url", default="https://api.ocr.space/parse/image")
+    parser.add_argument("--api-key", default="helloworld")
+    parser.add_argument("--workers", type=int, default=None, help="liveness worker processes")
+    parser.add_argument("--ocr-concurrency", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
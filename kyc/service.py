@@ -0,0 +1,276 @@
+"""Asyncio KYC onboarding service: OTP, selfie liveness and Aadhaar OCR as one session.
+
+A session goes through three stages:
+
+1. start(email)            - issue an OTP and queue the mail (vicky)
+2. verify_otp(id, code)    - check it; after the OTP backend's max_attempts
+                             wrong codes the OTP is burned and the session
+                             fails (TooManyAttempts)
+3. submit_documents(id, selfie, aadhaar)
+                           - liveness of the selfie (diksha) and OCR of the
+                             Aadhaar card (sunil) run concurrently
+
+The OpenCV liveness check is CPU-bound and runs on a process pool whose
+workers each keep one LivenessDetector. OCR uploads and SMTP are blocking
+network calls made through the existing pooled clients (HTTP session, SMTP
+pool); they run on a bounded thread pool so the event loop never waits on
+them, as do OTP issue and validation when the OTP backend is SQLite or
+Redis (AsyncOTPManager). Field extraction and the in-memory OTP backend take
+well under a millisecond and run inline. Mail goes out through the
+background DeliveryQueue, so start() does not wait for SMTP at all.
+
+Every stage has a timeout (StageTimeout). Backpressure is applied twice:
+each stage has a concurrency limit, and at most `max_pending` document
+checks may wait for it; beyond that submit_documents() fails fast with
+Overloaded instead of letting latency grow without bound.
+"""
+import asyncio
+import itertools
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from common import metrics
+from sunil.aadhaar_fields import parse_aadhaar_text
+from sunil.ocr_backends import OCRBackendError, response_error
+from vicky.otp_delivery import DeliveryQueue
+from vicky.otp_email import AsyncOTPManager, OTPManager, deliver_otp
+
+OTP_SENT, OTP_FAILED, VERIFIED, CHECKING, DONE = "otp_sent", "otp_failed", "verified", "checking", "done"
+# The detector records these in the worker process, where nothing exports
+# them; the parent records them again from the verdict's timings. Same
+# counter as diksha.detector's, without importing cv2 here.
+LIVENESS_CHECKS = metrics.counter("kyc_liveness_checks_total", "Liveness checks by verdict", ["verdict"])
+LIVENESS_SPANS = (("liveness.preprocess", "preprocess_ms"), ("liveness.haar_face", "face_ms"),
+                  ("liveness.haar_eyes", "eyes_ms"))
+
+_detector = None        # one per worker process
+
+
+class OnboardingError(Exception):
+    status = 400
+
+
+class SessionNotFound(OnboardingError):
+    status = 404
+
+
+class Overloaded(OnboardingError):
+    status = 503
+
+
+class TooManyAttempts(OnboardingError):
+    status = 429
+
+
+class StageTimeout(OnboardingError):
+    status = 504
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"The {stage} stage did not finish within {timeout}s")
+        self.stage = stage
+
+
+def _init_worker():
+    global _detector
+    from diksha.detector import LivenessDetector
+    _detector = LivenessDetector()
+    _detector.cascades()    # pay the classifier load up front, once
+
+
+def check_selfie(image_bytes):
+    """Worker: decode an encoded selfie and run the photo.py liveness check"""
+    import cv2
+    import numpy as np
+
+    frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return {"live": False, "reason": "Unreadable image"}
+    return _detector.check(frame)
+
+
+class Session:
+    __slots__ = ("id", "email", "state", "created", "result", "failures")
+
+    def __init__(self, session_id, email):
+        self.id = session_id
+        self.email = email
+        self.state = OTP_SENT
+        self.failures = 0       # wrong OTPs entered
+        self.created = time.monotonic()
+        self.result = None
+
+
+class OnboardingService:
+    def __init__(self, ocr_backend, mailer=None, otp_manager=None, liveness_workers=None,
+                 io_threads=8, ocr_concurrency=4, max_pending=64, session_ttl=900,
+                 timeouts=None, delivery_workers=4):
+        self.ocr_backend = ocr_backend
+        self.otp = otp_manager or OTPManager()
+        self.delivery = DeliveryQueue(lambda email, otp: deliver_otp(email, otp, mailer),
+                                      workers=delivery_workers)
+        self.liveness_workers = liveness_workers or os.cpu_count() or 1
+        self.io_threads = io_threads
+        self.ocr_concurrency = ocr_concurrency
+        self.max_pending = max_pending
+        self.session_ttl = session_ttl
+        self.timeouts = {"liveness": 10.0, "ocr": 30.0, "documents": 35.0}
+        self.timeouts.update(timeouts or {})
+        self.sessions = OrderedDict()      # oldest first, all with the same TTL
+        self.counters = {"sessions": 0, "verified": 0, "otp_failed": 0, "approved": 0, "rejected": 0,
+                         "overloaded": 0, "timeouts": 0}
+        self._pending = 0
+        self._ids = itertools.count(1)
+        self._processes = None
+        self._threads = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def open(self):
+        # Must be called from the event loop's thread, before the first request
+        self._processes = ProcessPoolExecutor(self.liveness_workers, initializer=_init_worker)
+        self._threads = ThreadPoolExecutor(self.io_threads, thread_name_prefix="kyc-io")
+        self._otp = AsyncOTPManager(manager=self.otp, executor=self._threads)
+        self._liveness_slots = asyncio.Semaphore(self.liveness_workers * 2)
+        self._ocr_slots = asyncio.Semaphore(self.ocr_concurrency)
+
+    def close(self):
+        self.delivery.close(timeout=5)
+        if self._processes:
+            self._processes.shutdown(cancel_futures=True)
+        if self._threads:
+            self._threads.shutdown(cancel_futures=True)
+        self.ocr_backend.close()
+
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.created > cutoff:
+                break
+            self.sessions.popitem(last=False)
+
+    def _session(self, session_id, *states):
+        session = self.sessions.get(session_id)
+        if session is None or time.monotonic() - session.created > self.session_ttl:
+            raise SessionNotFound("Unknown or expired onboarding session")
+        if states and session.state not in states:
+            raise OnboardingError(f"Session is {session.state}, expected {' or '.join(states)}")
+        return session
+
+    # Stage 1: OTP
+
+    async def start(self, email, client_ip=None):
+        """Issue an OTP for `email` and queue its mail; returns (session id or None, message)"""
+        self._expire_sessions()
+        otp, message = await self._otp.generate_otp(email, client_ip)
+        if otp is None:
+            return None, message
+        self.delivery.submit(email, otp, expires_at=time.monotonic() + self.otp.expiry_time)
+        session = Session(f"{next(self._ids)}-{secrets.token_hex(8)}", email)
+        self.sessions[session.id] = session
+        self.counters["sessions"] += 1
+        return session.id, message
+
+    async def verify_otp(self, session_id, code):
+        session = self._session(session_id, OTP_SENT, OTP_FAILED)
+        if session.state == OTP_FAILED:
+            raise TooManyAttempts("Too many wrong OTPs, start a new session")
+        ok, message = await self._otp.validate_otp(session.email, code)
+        if ok:
+            session.state = VERIFIED
+            self.counters["verified"] += 1
+            return ok, message
+        # The backend burns the OTP at the same count, so it cannot be guessed
+        # through another session either
+        session.failures += 1
+        if session.failures >= self.otp.backend.max_attempts:
+            session.state = OTP_FAILED
+            self.counters["otp_failed"] += 1
+            raise TooManyAttempts("Too many wrong OTPs, start a new session")
+        return ok, message
+
+    # Stage 2: documents
+
+    async def _stage(self, name, slots, executor, func, *args):
+        """Run func(*args) on `executor` once a slot is free, within the stage timeout"""
+        # The span includes the wait for a slot, i.e. what the session sees
+        with metrics.span(f"kyc.{name}"):
+            async with slots:
+                loop = asyncio.get_running_loop()
+                try:
+                    return await asyncio.wait_for(loop.run_in_executor(executor, func, *args),
+                                                  self.timeouts[name])
+                except asyncio.TimeoutError:
+                    # The worker finishes in the background; its result is dropped
+                    raise StageTimeout(name, self.timeouts[name]) from None
+
+    async def _liveness(self, selfie_bytes):
+        verdict = await self._stage("liveness", self._liveness_slots, self._processes,
+                                    check_selfie, selfie_bytes)
+        timings = verdict.pop("timings", None)
+        if timings is not None:
+            for span, key in LIVENESS_SPANS:
+                metrics.record(span, timings[key] / 1000)
+            LIVENESS_CHECKS.inc("live" if verdict["live"] else "fake")
+        return verdict
+
+    async def _ocr(self, image_bytes, filename):
+        try:
+            data = await self._stage("ocr", self._ocr_slots, self._threads,
+                                     self.ocr_backend.recognize, image_bytes, filename)
+        except OCRBackendError as e:
+            return {"error": str(e), "fields": None}
+        except self.ocr_backend.network_errors as e:
+            # A connection error or timeout is an OCR failure, not a server error
+            return {"error": f"{type(e).__name__}: {e}", "fields": None}
+        error = response_error(data)
+        if error:
+            return {"error": error, "fields": None}
+        return {"error": None, "fields": parse_aadhaar_text(data["ParsedResults"][0].get("ParsedText", ""))}
+
+    async def submit_documents(self, session_id, selfie_bytes, aadhaar_bytes, aadhaar_name="aadhaar.jpg"):
+        """Run liveness and OCR concurrently; returns the session result dict"""
+        session = self._session(session_id, VERIFIED)
+        if self._pending >= self.max_pending:
+            self.counters["overloaded"] += 1
+            raise Overloaded(f"{self._pending} document checks already pending, try again shortly")
+        self._pending += 1
+        session.state = CHECKING
+        started = time.perf_counter()
+        try:
+            liveness, ocr = await asyncio.wait_for(
+                asyncio.gather(self._liveness(selfie_bytes), self._ocr(aadhaar_bytes, aadhaar_name)),
+                self.timeouts["documents"])
+        except asyncio.TimeoutError:
+            session.state = VERIFIED    # may resubmit
+            self.counters["timeouts"] += 1
+            raise StageTimeout("documents", self.timeouts["documents"]) from None
+        except BaseException as e:
+            session.state = VERIFIED
+            if isinstance(e, StageTimeout):
+                self.counters["timeouts"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        fields = ocr["fields"] or {}
+        approved = bool(liveness.get("live")) and bool(fields.get("aadhaar_number"))
+        self.counters["approved" if approved else "rejected"] += 1
+        metrics.record("kyc.documents", time.perf_counter() - started)
+        session.state = DONE
+        session.result = {"approved": approved, "liveness": liveness, "aadhaar": fields,
+                          "ocr_error": ocr["error"],
+                          "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+        return session.result
+
+    def stats(self):
+        return dict(self.counters, active_sessions=len(self.sessions), pending=self._pending,
+                    delivery=self.delivery.stats(), otp=self.otp.stats())
@@ -0,0 +1,25 @@
+"""Aadhaar card OCR and field extraction.
+
+Importing the package loads nothing. The regex parser needs only the
+standard library; requests is imported when an HTTPBackend is created and
+OpenCV when an image is preprocessed.
+"""
+from common.lazy import lazy_exports
+
+__all__ = ["parse_aadhaar_text", "extract_fields", "FIELDS", "AadhaarDocument",
+           "HTTPBackend", "TesseractBackend", "ReplayBackend", "OCRBackendError",
+           "OCRCache", "preprocess_image", "extract_aadhaar_info"]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "parse_aadhaar_text": "sunil.aadhaar_fields",
+    "extract_fields": "sunil.aadhaar_fields",
+    "FIELDS": "sunil.aadhaar_fields",
+    "AadhaarDocument": "sunil.aadhaar_document",
+    "HTTPBackend": "sunil.ocr_backends",
+    "TesseractBackend": "sunil.ocr_backends",
+    "ReplayBackend": "sunil.ocr_backends",
+    "OCRBackendError": "sunil.ocr_backends",
+    "OCRCache": "sunil.ocr_cache",
+    "preprocess_image": "sunil.preprocess",
+    "extract_aadhaar_info": "sunil.ocr",
+})
@@ -0,0 +1,116 @@
+"""OCR text indexed once by line and by anchor keyword.
+
+Building an AadhaarDocument splits the text into lines (with the offset
+where each line starts) and records every position of the
+keywords the extractors key off: C/O-style relations, Name, To, Address,
+Aadhaar, Enrolment No, VTC, District, PIN and 12-digit number groups, plus
+where runs of 6+ digits occur ('six_digits'). Extractors then look only at a
+bounded window after an anchor instead of rescanning the whole text from
+every position, so the cost of parsing stays linear in the size of the text.
+"""
+import bisect
+import itertools
+import re
+
+# Anchor kind -> keywords, in lower case: they are matched against the lowered text
+ANCHOR_WORDS = {
+    'co': ('c/o', 's/o', 'd/o'),
+    'wo': ('w/o',),
+    'name': ('name', 'नाम'),
+    'to': ('to',),
+    'address': ('address',),
+    'aadhaar': ('aadhaar', 'आधार', 'uidai'),
+    'enrolment': ('enrolment', 'enrollment'),
+    'vtc': ('vtc',),
+    'district': ('district',),
+    'pin': ('pin', 'postal'),
+}
+_KIND_OF = {word: kind for kind, words in ANCHOR_WORDS.items() for word in words}
+# A plain alternation of literals (no named groups, no re.IGNORECASE) lets re
+# skip ahead by first character, which makes this scan ~10x faster
+_ANCHOR_SOURCE = '|'.join(re.escape(word) for word in sorted(_KIND_OF, key=len, reverse=True))
+_ANCHORS = re.compile(_ANCHOR_SOURCE)
+_ANCHORS_IGNORECASE = re.compile(_ANCHOR_SOURCE, re.IGNORECASE)
+_UID_GROUP = re.compile(r'[0-9]{4}[\s-]?[0-9]{4}[\s-]?[0-9]{4}')
+_DIGIT_RUN = re.compile(r'[0-9]{6,}')
+
+# An anchored match may span at most this many lines and characters...
+WINDOW_LINES = 6
+WINDOW_CHARS = 400
+# ...except the letter's "To" block (name, C/O and address lines)
+BLOCK_LINES = 12
+BLOCK_CHARS = 800
+
+
+def fold(text):
+    """Case-fold text for anchor checks.
+
+    re.IGNORECASE also lets 'i' match dotless 'ı' and dotted 'İ' (which
+    casefolds to 'i' + U+0307), so both are normalised to plain 'i' to never
+    skip a pattern that could match.
+    """
+    return text.casefold().replace('ı', 'i').replace('̇', '')
+
+
+class AadhaarDocument:
+    def __init__(self, text):
+        self.text = text
+        self.lines = text.split('\n')
+        # Offset of the first character of each line
+        self.starts = [0, *itertools.accumulate(len(line) + 1 for line in self.lines[:-1])]
+        self.anchors = {kind: [] for kind in ANCHOR_WORDS}
+        # Lowering first gives the same matches as re.IGNORECASE ('ſ' and 'ı'
+        # are what IGNORECASE also equates with 's' and 'i') as long as no
+        # character lowers to several, which would shift offsets
+        lowered = text.lower().replace('ſ', 's').replace('ı', 'i')
+        if len(lowered) == len(text):
+            for match in _ANCHORS.finditer(lowered):
+                self.anchors[_KIND_OF[match.group()]].append(match.start())
+        else:
+            for match in _ANCHORS_IGNORECASE.finditer(text):
+                self.anchors[_KIND_OF[fold(match.group())]].append(match.start())
+        self.anchors['uid'] = [match.start() for match in _UID_GROUP.finditer(text)]
+        # Last start of 6 consecutive digits (PIN-like) in each run of digits
+        self.anchors['six_digits'] = [match.end() - 6 for match in _DIGIT_RUN.finditer(text)]
+        self._folded = None
+
+    @property
+    def folded(self):
+        if self._folded is None:
+            self._folded = fold(self.text)
+        return self._folded
+
+    def line_at(self, offset):
+        """Index of the line containing `offset`"""
+        return bisect.bisect_right(self.starts, offset) - 1
+
+    def window_end(self, offset, max_lines=WINDOW_LINES, max_chars=WINDOW_CHARS):
+        """End offset of the window that starts at `offset`"""
+        last_line = self.line_at(offset) + max_lines
+        end = self.starts[last_line] if last_line < len(self.starts) else len(self.text)
+        return min(end, offset + max_chars)
+
+    def positions(self, *kinds):
+        """Sorted anchor offsets of the given kinds"""
+        if len(kinds) == 1:
+            return self.anchors[kinds[0]]
+        return sorted(offset for kind in kinds for offset in self.anchors[kind])
+
+    def last(self, *kinds):
+        """Offset of the last anchor of the given kinds, or -1"""
+        return max((self.anchors[kind][-1] for kind in kinds if self.anchors[kind]), default=-1)
+
+    def lines_with(self, kind):
+        """Indexes of lines containing an anchor of `kind`, in order, without repeats"""
+        seen = -1
+        for offset in self.anchors[kind]:
+            line = self.line_at(offset)
+            if line != seen:
+                seen = line
+                yield line
+
+    def has(self, kind, start, end):
+        """True if an anchor of `kind` starts in [start, end)"""
+        offsets = self.anchors[kind]
+        i = bisect.bisect_left(offsets, start)
+        return i < len(offsets) and offsets[i] < end
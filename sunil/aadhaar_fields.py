@@ -0,0 +1,395 @@
+"""Precompiled Aadhaar field extraction.
+
+All field patterns are compiled once at import. The OCR text is indexed once
+as an AadhaarDocument (lines plus anchor positions) and every pattern runs in
+one of these ways:
+
+* search   - over the whole text, for patterns that cannot backtrack badly;
+             skipped unless one of its keywords occurs in the case-folded text
+* at       - only at the offsets of an anchor, within a window of a few lines
+             after it (regex.match with pos/endpos), for patterns with
+             unbounded repetition after the keyword
+* before   - over the text before the last anchor of a kind, which replaces a
+             `(?=\n.*KEYWORD)` lookahead that rescanned the rest of the text
+             from every candidate position
+* segments - the C/O and Address blocks, found with one greedy match and
+             one scan instead of the old `([^,\n]+(?:,\s*[^,\n]+)*?)(?=END)`,
+             where spaces could go to either side of `\s*` / `[^,\n]+`, so
+             each extra segment doubled the backtracking
+* to_block - the lines after a "To" line, instead of the old
+             `((?:[^,\n]+,?\s*){2,}?)`, which backtracked exponentially on
+             lines starting with ','; a memoised walk over the same paths
+             visits each position a bounded number of times
+
+Every step is bounded by a window, so the worst case is linear in the text
+size. The first matching pattern per field wins, as before.
+"""
+import re
+import time
+
+from common import metrics
+from sunil.aadhaar_document import BLOCK_CHARS, BLOCK_LINES, AadhaarDocument, fold
+
+FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+SEARCH, AT, BEFORE, SEGMENTS, TO_BLOCK = 'search', 'at', 'before', 'segments', 'to_block'
+
+# field -> [(mode, pattern, anchors)]; for SEARCH the anchors are keywords for
+# the case-folded precheck (None = always run), otherwise AadhaarDocument kinds
+FIELD_PATTERNS = {
+    'name': [
+        (AT, r'(?:Name|नाम)[\s:]*([A-Za-z\s]{3,50}?)(?=\n|\r|Address|Father|Mother|S/O|D/O|W/O)', ('name',)),
+        (AT, r'To[\s\n:]+([A-Za-z\s]{3,50})(?=\n|\r|C/O|S/O|D/O)', ('to',)),
+        # was ^([A-Za-z\s]{3,50})(?=\n.*(?:C/O|S/O|D/O|Address))
+        (BEFORE, r'^([A-Za-z\s]{3,50})(?=\n)', ('co', 'address')),
+        # was ([A-Za-z\s]{3,50})(?=\n.*[0-9]{6}), a name before the PIN
+        (BEFORE, r'([A-Za-z\s]{3,50})(?=\n)', ('six_digits',)),
+    ],
+    'aadhaar_number': [
+        (AT, r'(?:Aadhaar|आधार|UIDAI)[\s\w]*?([0-9]{4}[\s-]?[0-9]{4}[\s-]?[0-9]{4})', ('aadhaar',)),
+        (SEARCH, r'\b([0-9]{4}[\s-]?[0-9]{4}[\s-]?[0-9]{4})\b', None),
+        (SEARCH, r'([0-9]{12})', None),  # 12 consecutive digits
+    ],
+    # SEGMENTS patterns are the part before the captured block; the block ends
+    # before VTC|Sub|District|PIN|Mobile|State|\d{6} (see _segments)
+    'address': [
+        (SEGMENTS, r'(?:C/O|S/O|D/O|W/O)[\s]*', ('co', 'wo')),
+        (SEGMENTS, r'Address[\s:]+', ('address',)),
+        # was (?:To:?[^\n]*\n)((?:[^,\n]+,?\s*){2,}?)(?=(?:VTC|Sub|PIN|District|Mobile|State|\d{6}))
+        (TO_BLOCK, r'(?:[^,\n]+,?\s*){2,}?', ('to',)),
+    ],
+    'mobile': [
+        (SEARCH, r'(?:Mobile|Mob|मोबाइल)[\s:.-]*([0-9]{10})', ('mob', 'मोबाइल')),
+        (SEARCH, r'(?:Phone|Ph)[\s:.-]*([0-9]{10})', ('ph',)),
+        (SEARCH, r'\b([0-9]{10})\b', None),
+    ],
+    'dob': [
+        (SEARCH, r'(?:DOB|Date\s+of\s+Birth|जन्म\s*तिथि)[\s:]*([0-9]{1,2}[/.-][0-9]{1,2}[/.-][0-9]{4})', ('dob', 'date', 'जन्म')),
+        (SEARCH, r'(?:DOB|Date\s+of\s+Birth|जन्म\s*तिथि)[\s:]*([0-9]{2}[0-9]{2}[0-9]{4})', ('dob', 'date', 'जन्म')),
+        (SEARCH, r'(\d{1,2}[/.-]\d{1,2}[/.-]\d{4})', None),
+    ],
+    'gender': [
+        (SEARCH, r'(?:Sex|Gender|लिंग)[\s:]*([MFmf](?:ale)?|पुरुष|महिला)', ('sex', 'gender', 'लिंग')),
+        (SEARCH, r'/\s*([MFmf])\s*/', ('/',)),
+        (SEARCH, r'\b(Male|Female|पुरुष|महिला)\b', ('male', 'पुरुष', 'महिला')),
+    ],
+    # Location fields
+    'vtc': [(SEARCH, r'VTC[\s:]+([^,\n]+)', ('vtc',)), (SEARCH, r'Village[\s:]+([^,\n]+)', ('village',))],
+    'po': [(SEARCH, r'(?:PO|Post\s+Office)[\s:]+([^,\n]+)', ('po',))],
+    'sub_district': [(SEARCH, r'(?:Sub[\s-]*District|Taluk|Tehsil)[\s:]+([^,\n]+)', ('sub', 'taluk', 'tehsil'))],
+    'district': [(SEARCH, r'District[\s:]+([^,\n]+)', ('district',))],
+    'state': [(SEARCH, r'State[\s:]+([^,\n]+)', ('state',))],
+    'pin': [(SEARCH, r'(?:PIN|Postal)[\s:]*([0-9]{6})', ('pin', 'postal')), (SEARCH, r'\b([0-9]{6})\b', None)],
+    'enrollment': [(SEARCH, r'(?:Enrollment|Enrolment)[\s]*(?:No\.?|Number)[\s:.-]*([0-9/]+)', ('enrol',))],
+}
+
+COMPILED_PATTERNS = {
+    field: [(mode, re.compile(pattern, FLAGS), anchors) for mode, pattern, anchors in patterns]
+    for field, patterns in FIELD_PATTERNS.items()
+}
+FIELDS = tuple(FIELD_PATTERNS)
+FIELD_SPANS = {field: f"ocr.field.{field}" for field in FIELDS}
+
+_WHITESPACE = re.compile(r'\s+')
+# What ends an address block; _ADDRESS_END_AT finds every position it starts at
+_ADDRESS_END = re.compile(r'VTC|Sub|District|PIN|Mobile|State|\d{6}', FLAGS)
+_ADDRESS_END_AT = re.compile(r'(?=VTC|Sub|District|PIN|Mobile|State|\d{6})', FLAGS)
+# Segments joined by ',' (plus whitespace up to a line break); the same strings
+# as the old `[^,\n]+(?:,\s*[^,\n]+)*`, without the ambiguity
+_SEGMENT_CHAIN = re.compile(r'[^,\n]+(?:,(?:\s*\n)?[^,\n]+)*')
+_SEGMENT = re.compile(r'[^,\n]+')
+_SPACES = re.compile(r'\s*')
+# AT anchors whose pattern cannot match unless this kind of anchor follows in the window
+_FOLLOWED_BY = {'aadhaar': 'uid'}
+
+
+def clean_value(value):
+    """Clean up common OCR artifacts in a captured value"""
+    value = _WHITESPACE.sub(' ', value.strip())
+    return value.replace('|', '').replace('_', '').strip()
+
+
+def _last_address_end(text, start, end):
+    """Offset of the last address terminator inside the comma-separated chain at `start`"""
+    chain = _SEGMENT_CHAIN.match(text, start, end)
+    if chain is None:
+        return None
+    found = None
+    for match in _ADDRESS_END_AT.finditer(text, start + 1, chain.end()):
+        # A segment has to keep at least one character before the terminator
+        if text[match.start() - 1] not in ',\n':
+            found = match.start()
+    return found
+
+
+def _segments(doc, prefix, anchors):
+    """Block after `prefix` up to an address terminator, as the old lazy pattern matched it.
+
+    In the old `PREFIX([^,\n]+(?:,\s*[^,\n]+)*?)(?=END)` every segment
+    boundary is followed by ',' or a newline, so the lookahead never matched
+    there: the pattern always ran to the end of the chain of segments and
+    backtracked to the last END starting inside a segment (or, failing that,
+    gave one character of the prefix back). That is one greedy match plus
+    one scan of the chain.
+    """
+    text = doc.text
+    for offset in doc.positions(*anchors):
+        end = doc.window_end(offset)
+        match = prefix.match(text, offset, end)
+        if match is None:
+            continue
+        start = match.end()
+        found = _last_address_end(text, start, end)
+        if found is None:
+            shorter = prefix.match(text, offset, start - 1)
+            if shorter is not None and shorter.end() == start - 1:
+                start -= 1
+                found = _last_address_end(text, start, end)
+        if found is not None:
+            return text[start:found]
+    return None
+
+
+def _block_end(text, pos, count, end, memo):
+    """Where the old `(?:[^,\n]+,?\s*){2,}?(?=END)` stops when it reaches `pos`
+    after `count` segments (2 = enough), or None; tries positions in the order
+    the regex engine backtracks through them.
+
+    The regex cuts a segment at every character, so it explores exponentially
+    many paths. Two facts make one visit per position enough: from the same
+    `count`, a position inside a segment reaches nothing its segment's start
+    did not already try, so once 2 segments are in only the terminators inside
+    it matter (the last one wins); and whitespace after a segment fails once
+    the first non-space position after it has, unless that is a comma.
+    """
+    key = (pos, count)
+    if key in memo:
+        return memo[key]
+    found = None
+    if count >= 2 and _ADDRESS_END.match(text, pos):
+        found = pos
+    else:
+        segment = _SEGMENT.match(text, pos, end)
+        if segment is not None:
+            found = _after_segment(text, pos, segment.end(), count, end, memo)
+    memo[key] = found
+    return found
+
+
+def _after_segment(text, pos, seg_end, count, end, memo):
+    following = min(count + 1, 2)
+    # The greedy try: the whole segment, its comma, then all whitespace
+    starts = [seg_end + 1, seg_end] if seg_end < end and text[seg_end] == ',' else [seg_end]
+    for start in starts:
+        stop = _SPACES.match(text, start, end).end()
+        # A run of spaces before ',' is a segment of its own, so it is not skipped
+        skip_spaces = count >= 1 and not (stop < end and text[stop] == ',')
+        for nxt in range(stop, start - 1, -1):
+            if nxt < stop and skip_spaces:
+                break
+            found = _block_end(text, nxt, following, end, memo)
+            if found is not None:
+                return found
+    if count >= 1:
+        # Shorter segments: the last terminator starting inside this one
+        found = _last_end_in_segment(text, seg_end, memo)
+        return found if found is not None and found > pos else None
+    for cut in range(seg_end - 1, pos, -1):
+        stop = _SPACES.match(text, cut, end).end()
+        for nxt in range(stop, cut - 1, -1):
+            found = _block_end(text, nxt, following, end, memo)
+            if found is not None:
+                return found
+    return None
+
+
+def _last_end_in_segment(text, seg_end, memo):
+    """Start of the last address terminator in the segment ending at `seg_end`"""
+    key = ('last', seg_end)
+    if key not in memo:
+        seg_start = max(text.rfind(',', 0, seg_end), text.rfind('\n', 0, seg_end)) + 1
+        found = None
+        for match in _ADDRESS_END_AT.finditer(text, seg_start, min(len(text), seg_end + 8)):
+            if match.start() >= seg_end:
+                break
+            found = match.start()
+        memo[key] = found
+    return memo[key]
+
+
+def _to_block(doc):
+    """Lines after a "To" line up to a VTC/PIN/... terminator, as the old pattern matched them"""
+    text = doc.text
+    last_start = None
+    for offset in doc.anchors['to']:
+        start = text.find('\n', offset) + 1
+        if start == 0:
+            return None     # no line after this "To", nor after any later one
+        if start == last_start:
+            continue
+        last_start = start
+        end = doc.window_end(start, BLOCK_LINES, BLOCK_CHARS)
+        found = _block_end(text, start, 0, end, {})
+        if found is not None:
+            return text[start:found]
+    return None
+
+
+def _first_match(mode, regex, anchors, doc):
+    """Captured text of the first match of one pattern, or None"""
+    if mode == SEARCH:
+        if anchors is not None and not any(anchor in doc.folded for anchor in anchors):
+            return None
+        match = regex.search(doc.text)
+    elif mode == AT:
+        followed_by = _FOLLOWED_BY.get(anchors[0])
+        for offset in doc.positions(*anchors):
+            end = doc.window_end(offset)
+            if followed_by and not doc.has(followed_by, offset, end):
+                continue
+            match = regex.match(doc.text, offset, end)
+            if match:
+                break
+        else:
+            return None
+    elif mode == BEFORE:
+        end = doc.last(*anchors)
+        if end < 0:
+            return None
+        match = regex.search(doc.text, 0, end)
+    elif mode == SEGMENTS:
+        return _segments(doc, regex, anchors)
+    else:
+        return _to_block(doc)
+    return match.group(1) if match else None
+
+
+def extract_field(field, doc):
+    """Return the first non-empty match for `field` in an AadhaarDocument, or None"""
+    for mode, regex, anchors in COMPILED_PATTERNS[field]:
+        value = _first_match(mode, regex, anchors, doc)
+        if value is not None:
+            result = clean_value(value)
+            if result:
+                return result
+    return None
+
+
+def _timed_extract_field(field, doc):
+    started = time.perf_counter()
+    value = extract_field(field, doc)
+    metrics.annotate(FIELD_SPANS[field], time.perf_counter() - started)
+    return value
+
+
+def extract_fields(text):
+    """Extract every field from OCR text (or an AadhaarDocument) in one call"""
+    doc = text if isinstance(text, AadhaarDocument) else AadhaarDocument(text)
+    # Per-field spans go to traces only: a dozen spans would add ~15% to every parse
+    if metrics.tracing():
+        return {field: _timed_extract_field(field, doc) for field in FIELDS}
+    return {field: extract_field(field, doc) for field in FIELDS}
+
+
+_AADHAAR_LINE = re.compile(r'^\d{4}\s+\d{4}\s+\d{4}')
+_ADDRESS_STOP_WORDS = ('vtc:', 'mumbai', 'maharashtra', 'aadhaar', 'vid', 'mobile:', 'sub district')
+_NAME_SKIP_WORDS = ('government', 'india', 'authority')
+
+
+def _fallback_name(doc):
+    """Name on the second line after 'Enrolment No' (the letter-style card)"""
+    lines = doc.lines
+    for i in doc.lines_with('enrolment'):
+        if 'Enrolment No' in lines[i] and i+2 < len(lines):
+            potential_name = lines[i+2].strip()
+            if len(potential_name.split()) >= 2 and not any(word in potential_name.lower() for word in _NAME_SKIP_WORDS):
+                return potential_name
+    return None
+
+
+def _fallback_address(doc):
+    """Lines from 'C/O:' up to the VTC/state/number block, joined with commas"""
+    first = next((i for i in doc.lines_with('co') if 'C/O:' in doc.lines[i]), None)
+    if first is None:
+        return None
+    address_parts = []
+    for line in doc.lines[first:]:
+        line = line.strip()
+        if 'C/O:' in line:
+            # Extract the part after C/O: on the same line
+            co_part = line.split('C/O:')[1].strip()
+            if co_part.endswith(','):
+                co_part = co_part[:-1]
+            address_parts.append(co_part)
+            continue
+        if (any(word in line.lower() for word in _ADDRESS_STOP_WORDS) or
+            _AADHAAR_LINE.match(line) or
+            line.startswith('KC') or
+            line.startswith('З')):
+            break
+        elif line and not line.isdigit():
+            # Clean up the line
+            clean_line = line.rstrip('.,')
+            if clean_line:
+                address_parts.append(clean_line)
+    return ', '.join(address_parts)
+
+
+def normalize_fields(info):
+    """Format/validate Aadhaar number, mobile, gender and DOB in place"""
+    if info['aadhaar_number']:
+        # Clean and format Aadhaar number
+        aadhaar = re.sub(r'[\s-]', '', info['aadhaar_number'])
+        if len(aadhaar) == 12 and aadhaar.isdigit():
+            info['aadhaar_number'] = f"{aadhaar[:4]} {aadhaar[4:8]} {aadhaar[8:]}"
+        else:
+            info['aadhaar_number'] = None
+
+    if info['mobile']:
+        # Clean mobile number
+        mobile = re.sub(r'[^\d]', '', info['mobile'])
+        if len(mobile) == 10 and mobile.isdigit():
+            info['mobile'] = mobile
+        else:
+            info['mobile'] = None
+
+    if info['gender']:
+        # Standardize gender
+        gender_lower = info['gender'].lower()
+        if any(x in gender_lower for x in ['f', 'female', 'महिला', 'स्त्री']):
+            info['gender'] = 'Female'
+        elif any(x in gender_lower for x in ['m', 'male', 'पुरुष']):
+            info['gender'] = 'Male'
+        else:
+            info['gender'] = None
+
+    if info['dob']:
+        # Standardize date format
+        dob = re.sub(r'[-.]', '/', info['dob'])
+        info['dob'] = dob if len(dob.replace('/', '')) == 8 else None
+    return info
+
+
+def parse_aadhaar_text(text):
+    """Turn raw OCR text into the final field dict.
+
+    Pure function: no I/O, no printing, same result for the same text, so it
+    can be re-run over archived OCR output whenever the patterns change.
+    """
+    with metrics.span("ocr.parse"):
+        return _parse_aadhaar_text(text)
+
+
+def _parse_aadhaar_text(text):
+    doc = AadhaarDocument(text)
+    info = extract_fields(doc)
+
+    # Special handling for the letter-style format - manual extraction if patterns fail
+    if not info['name'] or info['name'] == 'Government of India':
+        info['name'] = _fallback_name(doc) or info['name']
+    if not info['address']:
+        # As before the split: '' for a bare "C/O:", unchanged without one
+        address = _fallback_address(doc)
+        if address is not None:
+            info['address'] = address
+    return normalize_fields(info)
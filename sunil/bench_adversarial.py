@@ -0,0 +1,97 @@
+"""Worst-case field extraction on adversarial OCR text.
+
+    python -m sunil.bench_adversarial                 # sizes 1, 4, 16, 64 KB
+    python -m sunil.bench_adversarial --sizes 1 8 64 --legacy-timeout 5
+
+Each family repeats a fragment that made the old patterns backtrack (C/O
+chains with no terminator, 'To' blocks of commas, many name-like lines with
+no PIN, ...) to a growing size. The extractor's cost per KB must stay flat as
+the text grows; the run fails if it grows more than --max-growth times from
+the smallest to the largest size. The old code is timed in a child process
+and reported as '>N s' when it does not finish within --legacy-timeout.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+
+from sunil.aadhaar_fields import extract_fields
+from sunil.bench_extract import legacy_extract_fields
+
+FAMILIES = {
+    "care_of_chain": "C/O Mohan, ",
+    "address_no_end": "Address: 12 MG Road, Andheri East, ",
+    "to_commas": "To\n,, ,\n",
+    "name_lines": "Ravi Kumar Sharma\n",
+    "name_spaces": "Name            ",
+    "aadhaar_words": "Aadhaar card number ",
+    "digit_noise": "1234 567 89 0123 ",
+}
+
+
+def build(fragment, size_kb):
+    return fragment * (size_kb * 1024 // len(fragment) + 1)
+
+
+def _legacy_worker(text, queue):
+    t0 = time.perf_counter()
+    legacy_extract_fields(text)
+    queue.put(time.perf_counter() - t0)
+
+
+def time_legacy(text, timeout):
+    """Seconds the old extractor takes, or None if it runs past `timeout`"""
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_legacy_worker, args=(text, queue), daemon=True)
+    proc.start()
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+        return None
+    return queue.get()
+
+
+def time_new(text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        extract_fields(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adversarial Aadhaar extraction benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64], help="text sizes in KB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-timeout", type=float, default=2.0, help="seconds; 0 skips the old code")
+    parser.add_argument("--max-growth", type=float, default=4.0,
+                        help="fail if µs/KB grows more than this from smallest to largest size")
+    args = parser.parse_args()
+    sizes = sorted(args.sizes)
+
+    failed = []
+    print(f"{'family':<16} {'KB':>4} {'old':>10} {'new':>10} {'µs/KB':>9}")
+    for family, fragment in FAMILIES.items():
+        per_kb = []
+        for size in sizes:
+            text = build(fragment, size)
+            new = time_new(text, args.repeat)
+            per_kb.append(new * 1e6 / size)
+            old = "-"
+            if args.legacy_timeout:
+                seconds = time_legacy(text, args.legacy_timeout)
+                old = f">{args.legacy_timeout:g} s" if seconds is None else f"{seconds * 1000:.1f} ms"
+            print(f"{family:<16} {size:>4} {old:>10} {new * 1000:>7.2f} ms {per_kb[-1]:>9.1f}", flush=True)
+        growth = per_kb[-1] / per_kb[0] if per_kb[0] else 1.0
+        if growth > args.max_growth:
+            failed.append(f"{family} (x{growth:.1f})")
+
+    if failed:
+        sys.exit(f"❌ Cost per KB grows with text size: {', '.join(failed)}")
+    print(f"✓ Cost per KB stays within x{args.max_growth:g} from {sizes[0]} KB to {sizes[-1]} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Field-extraction throughput: old per-call regexes vs precompiled extractor.
+
+    python -m sunil.bench_extract                    # synthetic corpus
+    python -m sunil.bench_extract --corpus ocr_texts/  # plus real OCR .txt files
+
+Both implementations must return identical dicts for every document; the
+benchmark fails loudly if they do not.
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import time
+
+from sunil.aadhaar_fields import extract_fields
+
+FIRST = ["Ravi", "Priya", "Amit", "Sunita", "Rahul", "Anjali", "Vikram", "Neha", "Suresh", "Kavita"]
+LAST = ["Sharma", "Patel", "Kumar", "Singh", "Deshmukh", "Iyer", "Reddy", "Gupta", "Joshi", "Nair"]
+STREETS = ["MG Road", "Station Road", "Gandhi Nagar", "Shivaji Chowk", "Nehru Colony", "Link Road"]
+PLACES = [("Mumbai", "Maharashtra"), ("Pune", "Maharashtra"), ("Jaipur", "Rajasthan"),
+          ("Indore", "Madhya Pradesh"), ("Nashik", "Maharashtra"), ("Surat", "Gujarat")]
+# "To" blocks where the old pattern stops at a terminator inside a segment
+EDGE_CASES = [
+    "To\nRavi Kumar\nHouse 12, MG Road State Highway\nMaharashtra",
+    "To\nHouse 12 VTC Pune\nMaharashtra",
+    "To\nMG,District \nRavi,  , Highway State State,",
+    "x to y\n400001\nPune\nMG  \t,   , VTC 400001 District \nMobile\n",
+    "To:\nTomato Mobile,District State \n\t,to Mobile\nTomato  Ravi,\nMobile\nRavi, State,\n",
+]
+
+
+def legacy_extract_fields(parsed_text):
+    """The extraction code as it was inside extract_aadhaar_info"""
+    # Enhanced field extraction function
+    def extract_field(patterns, text, default=None):
+        """Try multiple patterns and return the first match"""
+        for pattern in patterns:
+            try:
+                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+                if match:
+                    result = match.group(1).strip()
+                    # Clean up common OCR artifacts
+                    result = re.sub(r'\s+', ' ', result)
+                    result = result.replace('|', '').replace('_', '').strip()
+                    if result:
+                        return result
+            except Exception as e:
+                print(f"Pattern error: {e}")
+                continue
+        return default
+
+    # Enhanced name extraction patterns
+    name_patterns = [
+        r'(?:Name|नाम)[\s:]*([A-Za-z\s]{3,50}?)(?=\n|\r|Address|Father|Mother|S/O|D/O|W/O)',
+        r'To[\s\n:]+([A-Za-z\s]{3,50})(?=\n|\r|C/O|S/O|D/O)',
+        r'^([A-Za-z\s]{3,50})(?=\n.*(?:C/O|S/O|D/O|Address))',
+        r'([A-Za-z\s]{3,50})(?=\n.*[0-9]{6})',  # Name before PIN
+    ]
+
+    # Enhanced Aadhaar number patterns
+    aadhaar_patterns = [
+        r'(?:Aadhaar|आधार|UIDAI)[\s\w]*?([0-9]{4}[\s-]?[0-9]{4}[\s-]?[0-9]{4})',
+        r'\b([0-9]{4}[\s-]?[0-9]{4}[\s-]?[0-9]{4})\b',
+        r'([0-9]{12})',  # 12 consecutive digits
+    ]
+
+    # Enhanced address patterns
+    address_patterns = [
+        r'(?:C/O|S/O|D/O|W/O)[\s]*([^,\n]+(?:,\s*[^,\n]+)*?)(?=(?:VTC|Sub|District|PIN|Mobile|State|\d{6}))',
+        r'Address[\s:]+([^,\n]+(?:,\s*[^,\n]+)*?)(?=(?:VTC|Sub|District|PIN|Mobile|State|\d{6}))',
+        r'(?:To:?[^\n]*\n)((?:[^,\n]+,?\s*){2,}?)(?=(?:VTC|Sub|PIN|District|Mobile|State|\d{6}))'
+    ]
+
+    # Enhanced mobile patterns
+    mobile_patterns = [
+        r'(?:Mobile|Mob|मोबाइल)[\s:.-]*([0-9]{10})',
+        r'(?:Phone|Ph)[\s:.-]*([0-9]{10})',
+        r'\b([0-9]{10})\b'
+    ]
+
+    # Enhanced DOB patterns
+    dob_patterns = [
+        r'(?:DOB|Date\s+of\s+Birth|जन्म\s*तिथि)[\s:]*([0-9]{1,2}[/.-][0-9]{1,2}[/.-][0-9]{4})',
+        r'(?:DOB|Date\s+of\s+Birth|जन्म\s*तिथि)[\s:]*([0-9]{2}[0-9]{2}[0-9]{4})',
+        r'(\d{1,2}[/.-]\d{1,2}[/.-]\d{4})'
+    ]
+
+    # Enhanced gender patterns
+    gender_patterns = [
+        r'(?:Sex|Gender|लिंग)[\s:]*([MFmf](?:ale)?|पुरुष|महिला)',
+        r'/\s*([MFmf])\s*/',
+        r'\b(Male|Female|पुरुष|महिला)\b'
+    ]
+
+    # Location patterns
+    vtc_patterns = [r'VTC[\s:]+([^,\n]+)', r'Village[\s:]+([^,\n]+)']
+    po_patterns = [r'(?:PO|Post\s+Office)[\s:]+([^,\n]+)']
+    sub_district_patterns = [r'(?:Sub[\s-]*District|Taluk|Tehsil)[\s:]+([^,\n]+)']
+    district_patterns = [r'District[\s:]+([^,\n]+)']
+    state_patterns = [r'State[\s:]+([^,\n]+)']
+    pin_patterns = [r'(?:PIN|Postal)[\s:]*([0-9]{6})', r'\b([0-9]{6})\b']
+    enrollment_patterns = [r'(?:Enrollment|Enrolment)[\s]*(?:No\.?|Number)[\s:.-]*([0-9/]+)']
+
+    # Extract all fields
+    extracted_info = {
+        'name': extract_field(name_patterns, parsed_text),
+        'aadhaar_number': extract_field(aadhaar_patterns, parsed_text),
+        'address': extract_field(address_patterns, parsed_text),
+        'mobile': extract_field(mobile_patterns, parsed_text),
+        'dob': extract_field(dob_patterns, parsed_text),
+        'gender': extract_field(gender_patterns, parsed_text),
+        'vtc': extract_field(vtc_patterns, parsed_text),
+        'po': extract_field(po_patterns, parsed_text),
+        'sub_district': extract_field(sub_district_patterns, parsed_text),
+        'district': extract_field(district_patterns, parsed_text),
+        'state': extract_field(state_patterns, parsed_text),
+        'pin': extract_field(pin_patterns, parsed_text),
+        'enrollment': extract_field(enrollment_patterns, parsed_text)
+    }
+    return extracted_info
+
+
+def synthetic_document(rng):
+    """One OCR-like Aadhaar letter with random fields, omissions and noise"""
+    name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    father = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    city, state = rng.choice(PLACES)
+    digits = "".join(rng.choice("0123456789") for _ in range(12))
+    lines = ["Government of India", "Unique Identification Authority of India"]
+    if rng.random() < 0.8:
+        lines.append(f"Enrolment No.: {rng.randint(1000, 9999)}/{rng.randint(10000, 99999)}/{rng.randint(10000, 99999)}")
+    lines += ["To", name]
+    # Without "C/O:" the address comes from the lines after "To"
+    co = "C/O: " if rng.random() < 0.8 else ""
+    lines.append(f"{co}{father}, {rng.randint(1, 999)} {rng.choice(STREETS)},")
+    if rng.random() < 0.5:
+        lines.append(f"Near {rng.choice(STREETS)}, {city} East")
+    if rng.random() < 0.2:
+        lines.append(f"Opp State Bank {rng.choice(STREETS)}")
+    location = [f"VTC: {city}", f"PO: {city}", f"Sub District: {city}"]
+    lines.append(", ".join(location) + ",")
+    lines.append(f"District: {city}, State: {state}, PIN Code: {rng.randint(100000, 999999)}")
+    if rng.random() < 0.7:
+        lines.append(f"Mobile: {rng.randint(6000000000, 9999999999)}")
+    if rng.random() < 0.8:
+        lines.append(f"DOB: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2010)}")
+    lines.append(rng.choice(["Male", "Female", "MALE", "FEMALE / F /"]))
+    lines.append(f"{digits[:4]} {digits[4:8]} {digits[8:]}")
+    if rng.random() < 0.3:
+        lines.append("VID : " + " ".join(str(rng.randint(1000, 9999)) for _ in range(4)))
+    # Noise has no commas: a line starting with ',' makes the old "To:" address
+    # pattern backtrack exponentially, which would only measure that one doc
+    for _ in range(rng.randint(0, 3)):
+        noise = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz |_.") for _ in range(rng.randint(5, 40)))
+        lines.insert(rng.randint(0, len(lines)), noise)
+    return "\n".join(lines)
+
+
+def load_corpus(args):
+    rng = random.Random(args.seed)
+    docs = [synthetic_document(rng) for _ in range(args.synthetic)] + EDGE_CASES
+    if args.corpus:
+        for path in sorted(glob.glob(os.path.join(args.corpus, "*.txt"))):
+            with open(path, encoding="utf-8") as f:
+                docs.append(f.read())
+    return docs
+
+
+def docs_per_sec(extract, docs, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            extract(doc)
+    return len(docs) * repeat / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aadhaar field extraction benchmark")
+    parser.add_argument("--synthetic", type=int, default=2000, help="number of synthetic documents")
+    parser.add_argument("--corpus", help="directory of real OCR text files (*.txt)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    docs = load_corpus(args)
+    for doc in docs:
+        old, new = legacy_extract_fields(doc), extract_fields(doc)
+        if old != new:
+            raise SystemExit(f"Mismatch:\n{doc}\nold={old}\nnew={new}")
+
+    before = docs_per_sec(legacy_extract_fields, docs, args.repeat)
+    after = docs_per_sec(extract_fields, docs, args.repeat)
+    print(f"{len(docs)} documents, identical output")
+    print(f"before  {before:9.0f} docs/sec")
+    print(f"after   {after:9.0f} docs/sec   (x{after / before:.2f})")
+
+
+if __name__ == "__main__":
+    main()
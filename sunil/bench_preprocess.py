@@ -0,0 +1,99 @@
+"""End-to-end effect of client-side preprocessing on OCR uploads.
+
+    python -m sunil.bench_preprocess --images cards/ --url https://api.ocr.space/parse/image --api-key KEY
+    python -m sunil.bench_preprocess          # synthetic 12 MP photos against a local stub
+
+Every image is OCR'd twice, as-is and preprocessed, one request at a time.
+Reports mean upload size, mean end-to-end latency and the field hit rate
+(share of Aadhaar fields found). Against the stub the OCR text is canned, so
+only the size and latency columns are meaningful there.
+"""
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+
+from sunil.aadhaar_fields import FIELDS
+from sunil.ocr_backends import HTTPBackend
+from sunil.ocr_batch import BatchOCRClient
+from sunil.stub_ocr_server import start_stub_server
+
+
+def synthetic_photos(directory, count=5, size=(4000, 3000)):
+    """Noisy phone-sized JPEGs with a light card-shaped region"""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    width, height = size
+    paths = []
+    for i in range(count):
+        photo = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+        cv2.rectangle(photo, (width // 6, height // 4), (width * 5 // 6, height * 3 // 4),
+                      (235, 235, 235), -1)
+        for row in range(8):
+            y = height // 4 + 150 + row * 150
+            cv2.putText(photo, f"Line {row} VTC: Mumbai 400069", (width // 6 + 100, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 3, (20, 20, 20), 6)
+        path = os.path.join(directory, f"photo{i}.jpg")
+        cv2.imwrite(path, photo, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        paths.append(path)
+    return paths
+
+
+def run(client, paths):
+    results = list(client.process(paths))
+    hits = sum(sum(1 for f in FIELDS if (r["fields"] or {}).get(f)) for r in results)
+    return {
+        "bytes": statistics.mean(r["upload_bytes"] for r in results),
+        "latency_ms": statistics.mean(r["latency_ms"] for r in results),
+        "upload_ms": statistics.mean(r.get("upload_ms", 0) for r in results),
+        "hit_rate": hits / (len(results) * len(FIELDS)),
+        "ok": sum(r["ok"] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR preprocessing benchmark")
+    parser.add_argument("--images", help="directory of card photos (default: synthetic)")
+    parser.add_argument("--url", help="OCR endpoint (default: local stub)")
+    parser.add_argument("--api-key", default=os.environ.get("OCR_SPACE_API_KEY", "helloworld"))
+    parser.add_argument("--bandwidth", type=float, default=1e6,
+                        help="stub upload bandwidth in bytes/sec (default 1 MB/s)")
+    parser.add_argument("--long-edge", type=int, default=1600)
+    parser.add_argument("--crop", action="store_true")
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_stub_server(latency=0.1, bandwidth=args.bandwidth)
+        url = server.url
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = sorted(p for p in glob.glob(os.path.join(args.images, "*"))
+                           if os.path.splitext(p)[1].lower() in (".jpg", ".jpeg", ".png"))
+        else:
+            paths = synthetic_photos(tmp)
+        options = {"long_edge": args.long_edge, "crop": args.crop, "jpeg_quality": args.jpeg_quality}
+        rows = {}
+        for label, preprocess in (("as-is", None), ("preprocessed", options)):
+            client = BatchOCRClient(HTTPBackend(args.api_key, url), concurrency=1, preprocess=preprocess)
+            rows[label] = run(client, paths)
+            client.close()
+    if server:
+        server.shutdown()
+
+    print(f"{len(paths)} images via {url}")
+    for label, row in rows.items():
+        print(f"{label:<13} {row['bytes'] / 1024:8.0f} KB   e2e {row['latency_ms']:7.0f} ms   "
+              f"upload+OCR {row['upload_ms']:7.0f} ms   field hit rate {row['hit_rate']:.0%}   "
+              f"ok {row['ok']}/{len(paths)}")
+    before, after = rows["as-is"], rows["preprocessed"]
+    print(f"saved {(before['bytes'] - after['bytes']) / 1024:.0f} KB and "
+          f"{before['latency_ms'] - after['latency_ms']:.0f} ms per image")
+
+
+if __name__ == "__main__":
+    main()
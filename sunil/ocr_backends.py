@@ -0,0 +1,182 @@
+"""OCR backends used by the Aadhaar extraction pipeline.
+
+Every backend turns image bytes into an OCR.space-shaped response dict
+({"ParsedResults": [{"ParsedText": ..., "ErrorMessage": ...}]}), so parsing,
+caching and batching do not care where the text came from:
+
+* HTTPBackend      - the OCR.space API (what ocr.py always did)
+* TesseractBackend - a local `tesseract` binary, for offline use
+* ReplayBackend    - stored responses from a directory, optionally recording
+                     misses from another backend, so parsing throughput can be
+                     measured and regression-tested with no network
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+from common import metrics
+
+OCR_URL = "https://api.ocr.space/parse/image"
+
+REQUESTS = metrics.counter("kyc_ocr_requests_total", "OCR backend requests by backend and outcome",
+                           ["backend", "status"])
+
+
+class OCRBackendError(Exception):
+    """OCR request failed; `status` is the HTTP status when there was one"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def build_payload(api_key, language="eng", engine=2):
+    """Form fields for an OCR.space parse request"""
+    return {
+        "apikey": api_key,
+        "language": language,
+        "isOverlayRequired": False,
+        "OCREngine": engine  # Use OCR Engine 2 for better accuracy
+    }
+
+
+def response_error(data):
+    """Return an error message for a decoded OCR.space response, or None if it has text"""
+    if isinstance(data, str):
+        return f"API Error: {data}"
+    if not data.get('ParsedResults') or len(data['ParsedResults']) == 0:
+        return "No text found in image"
+    if data['ParsedResults'][0].get('ErrorMessage'):
+        return f"OCR Error: {data['ParsedResults'][0]['ErrorMessage']}"
+    return None
+
+
+def text_response(text):
+    """Wrap plain OCR text in an OCR.space-shaped response"""
+    return {"ParsedResults": [{"ParsedText": text, "ErrorMessage": "", "FileParseExitCode": 1}],
+            "OCRExitCode": 1, "IsErroredOnProcessing": False}
+
+
+class OCRBackend:
+    language = "eng"
+    engine = None       # part of the cache key, so results of different engines never mix
+    network_errors = ()     # what a failed request raises besides OCRBackendError
+    transient_errors = ()   # the subset worth retrying (resets, timeouts)
+
+    def recognize(self, image_bytes, filename="image.jpg"):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class HTTPBackend(OCRBackend):
+    def __init__(self, api_key, url=OCR_URL, language="eng", engine=2, timeout=30, pool_size=4):
+        self.url = url
+        self.language = language
+        self.engine = engine
+        self.timeout = timeout
+        self.payload = build_payload(api_key, language, engine)
+        # requests is only imported by the backend that needs it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.network_errors = (requests.RequestException,)
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+        # One pooled session, safe to share between worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def recognize(self, image_bytes, filename="image.jpg"):
+        files = {"filename": (filename, image_bytes)}
+        try:
+            with metrics.span("ocr.upload"):
+                res = self.session.post(self.url, data=self.payload, files=files, timeout=self.timeout)
+        except self.network_errors:
+            REQUESTS.inc("http", "error")
+            raise
+        REQUESTS.inc("http", str(res.status_code))
+        if res.status_code != 200:
+            try:
+                retry_after = float(res.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = None
+            raise OCRBackendError(f"HTTP Error {res.status_code}: {res.text[:500]}",
+                                  res.status_code, retry_after)
+        try:
+            return res.json()
+        except ValueError:
+            raise OCRBackendError(f"Invalid JSON response: {res.text[:500]}", res.status_code)
+
+    def close(self):
+        self.session.close()
+
+
+class TesseractBackend(OCRBackend):
+    engine = "tesseract"
+
+    def __init__(self, language="eng", binary="tesseract", timeout=60):
+        self.binary = shutil.which(binary)
+        if self.binary is None:
+            raise RuntimeError("tesseract is not installed (e.g. apt install tesseract-ocr)")
+        self.language = language
+        self.timeout = timeout
+
+    def recognize(self, image_bytes, filename="image.jpg"):
+        # "stdin stdout" makes tesseract read the image from stdin and print text
+        with metrics.span("ocr.tesseract"):
+            proc = subprocess.run([self.binary, "stdin", "stdout", "-l", self.language],
+                                  input=image_bytes, capture_output=True, timeout=self.timeout)
+        REQUESTS.inc("tesseract", "ok" if proc.returncode == 0 else "error")
+        if proc.returncode != 0:
+            raise OCRBackendError(f"tesseract failed: {proc.stderr.decode(errors='replace')[:500]}")
+        return text_response(proc.stdout.decode("utf-8", errors="replace"))
+
+
+class ReplayBackend(OCRBackend):
+    """Serves responses stored as <sha256 of image>.json in `directory`.
+
+    With a `record` backend, misses are fetched from it and stored, so a
+    first run against the real service records a corpus that later runs
+    replay offline.
+    """
+
+    def __init__(self, directory, record=None):
+        self.directory = directory
+        self.record = record
+        if record is not None:
+            self.language, self.engine = record.language, record.engine
+        else:
+            self.engine = "replay"
+        os.makedirs(directory, exist_ok=True)
+        self.replayed = 0
+        self.recorded = 0
+
+    def path_for(self, image_bytes):
+        return os.path.join(self.directory, hashlib.sha256(image_bytes).hexdigest() + ".json")
+
+    def recognize(self, image_bytes, filename="image.jpg"):
+        path = self.path_for(image_bytes)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.replayed += 1
+                return json.load(f)
+        if self.record is None:
+            raise OCRBackendError(f"No recorded response for {filename}", 404)
+        data = self.record.recognize(image_bytes, filename)
+        if response_error(data) is None:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self.recorded += 1
+        return data
+
+    def close(self):
+        if self.record is not None:
+            self.record.close()
@@ -0,0 +1,251 @@
+"""Concurrent batch OCR over many Aadhaar card images.
+
+    python -m sunil.ocr_batch cards/ --api-key KEY --concurrency 4 --out results.jsonl
+    python -m sunil.ocr_batch cards/ --url http://127.0.0.1:8765/parse/image   # stub server
+
+    python -m sunil.ocr_batch cards/ --backend tesseract            # offline
+    python -m sunil.ocr_batch cards/ --backend replay --replay-dir recorded/
+
+With the HTTP backend one pooled requests.Session is shared by all worker
+threads, so connections (and TLS sessions) are reused instead of opened per
+image. A shared rate
+limiter spaces requests out and, when the service answers 429, pauses every
+worker with exponential backoff (honouring Retry-After). Results are written
+as soon as each image finishes.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sunil.aadhaar_fields import parse_aadhaar_text
+from sunil.ocr_backends import (OCR_URL, HTTPBackend, OCRBackendError, ReplayBackend,
+                                TesseractBackend, response_error)
+from sunil.ocr_cache import OCRCache
+from sunil.preprocess import preprocess_image
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp", ".pdf"}
+
+
+class RateLimiter:
+    """Spaces requests out and backs every worker off after a 429"""
+
+    def __init__(self, rate=None, base_backoff=1.0, max_backoff=60.0):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self._next = 0.0        # monotonic time of the next free slot
+        self._strikes = 0       # consecutive 429s
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def throttle(self, retry_after=None):
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            if now < self._paused_until:
+                # Sent before the current pause began; it is not a new strike
+                return
+            self._strikes += 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (self._strikes - 1))
+            if retry_after:
+                delay = max(delay, retry_after)
+            delay *= random.uniform(1.0, 1.25)     # jitter so workers don't stampede
+            self._paused_until = now + delay
+            self._next = max(self._next, self._paused_until)
+
+    def retry_delay(self, attempt):
+        """Backoff before retrying one request after a network error"""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+        return delay * random.uniform(1.0, 1.25)
+
+    def success(self):
+        with self._lock:
+            self._strikes = 0
+
+
+class BatchOCRClient:
+    def __init__(self, backend, concurrency=4, rate=None, max_retries=5, cache=None,
+                 preprocess=None):
+        self.backend = backend
+        self.cache = cache
+        self.preprocess = preprocess    # preprocess_image() options, None = upload as-is
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rate)
+
+    def ocr(self, path):
+        """OCR one image file, retrying on 429/5xx and connection errors; always returns a result dict"""
+        started = time.perf_counter()
+        result = {"path": path, "ok": False, "text": None, "fields": None, "error": None,
+                  "status": None, "attempts": 0}
+        try:
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+            name = os.path.basename(path)
+            if self.preprocess is not None:
+                image_bytes, result["preprocess"] = preprocess_image(image_bytes, **self.preprocess)
+                if result["preprocess"]["applied"]:
+                    name = os.path.splitext(name)[0] + ".jpg"
+            result["upload_bytes"] = len(image_bytes)
+            cache_key = OCRCache.key(image_bytes, self.backend.language, self.backend.engine)
+            cached = self.cache.get(cache_key) if self.cache else None
+            if cached is not None:
+                result["status"] = "cached"
+                result["text"] = cached[0].get('ParsedText', '')
+                result["fields"] = parse_aadhaar_text(result["text"])
+                result["ok"] = True
+            while not result["ok"] and result["attempts"] <= self.max_retries:
+                result["attempts"] += 1
+                self.limiter.acquire()
+                t0 = time.perf_counter()
+                try:
+                    data = self.backend.recognize(image_bytes, name)
+                except OCRBackendError as e:
+                    result["status"] = e.status
+                    result["error"] = str(e)
+                    if e.status == 429 or (e.status or 0) >= 500:
+                        self.limiter.throttle(e.retry_after)
+                        continue
+                    break
+                except self.backend.transient_errors as e:
+                    # Resets and timeouts are usually transient; only this request backs off
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    if result["attempts"] <= self.max_retries:
+                        time.sleep(self.limiter.retry_delay(result["attempts"]))
+                    continue
+                finally:
+                    result["upload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                self.limiter.success()
+                result["error"] = response_error(data)
+                if result["error"] is None:
+                    if self.cache:
+                        self.cache.put(cache_key, data['ParsedResults'])
+                    result["text"] = data['ParsedResults'][0].get('ParsedText', '')
+                    result["fields"] = parse_aadhaar_text(result["text"])
+                    result["ok"] = True
+                break
+        except (OSError, ValueError, subprocess.SubprocessError) + self.backend.network_errors as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def process(self, paths):
+        """Yield result dicts in completion order, keeping at most 2x concurrency queued"""
+        max_in_flight = self.concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = set()
+            for path in paths:
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(pool.submit(self.ocr, path))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def close(self):
+        self.backend.close()
+
+
+def iter_images(sources):
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Aadhaar OCR")
+    parser.add_argument("sources", nargs="+", help="image files or directories")
+    parser.add_argument("--backend", choices=["http", "tesseract", "replay"], default="http")
+    parser.add_argument("--api-key", default=os.environ.get("OCR_SPACE_API_KEY", "helloworld"))
+    parser.add_argument("--url", default=OCR_URL)
+    parser.add_argument("--replay-dir", default="ocr_recordings", help="stored responses for replay")
+    parser.add_argument("--record", action="store_true",
+                        help="with --backend replay, fetch misses over HTTP and store them")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None, help="max requests per second")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--out", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--cache", default=None, help="SQLite OCR cache file")
+    parser.add_argument("--preprocess", action="store_true", help="shrink images before upload")
+    parser.add_argument("--long-edge", type=int, default=1600)
+    parser.add_argument("--dpi", type=int, default=None, help="target DPI (overrides --long-edge)")
+    parser.add_argument("--color", action="store_true", help="keep colour when preprocessing")
+    parser.add_argument("--crop", action="store_true", help="auto-crop to the card")
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    args = parser.parse_args()
+
+    preprocess = None
+    if args.preprocess:
+        preprocess = {"long_edge": args.long_edge, "dpi": args.dpi, "grayscale": not args.color,
+                      "crop": args.crop, "jpeg_quality": args.jpeg_quality}
+
+    cache = OCRCache(args.cache) if args.cache else None
+    if args.backend == "tesseract":
+        try:
+            backend = TesseractBackend()
+        except RuntimeError as e:
+            sys.exit(f"❌ {e}")
+    else:
+        backend = HTTPBackend(args.api_key, args.url, pool_size=args.concurrency)
+        if args.backend == "replay":
+            backend = ReplayBackend(args.replay_dir, record=backend if args.record else None)
+    client = BatchOCRClient(backend, args.concurrency, args.rate, args.retries,
+                            cache=cache, preprocess=preprocess)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    latencies = []
+    ok = saved = 0
+    started = time.perf_counter()
+    try:
+        for result in client.process(iter_images(args.sources)):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            latencies.append(result["latency_ms"])
+            ok += result["ok"]
+            saved += result.get("preprocess", {}).get("saved_bytes", 0)
+    finally:
+        client.close()
+        if cache:
+            cache_stats = cache.stats()
+            cache.close()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    if latencies:
+        print(f"✓ {ok}/{len(latencies)} images in {elapsed:.2f}s "
+              f"({len(latencies) / elapsed:.1f} images/sec, p50 {statistics.median(latencies):.0f} ms, "
+              f"{client.limiter.throttled} throttled)", file=sys.stderr)
+        if preprocess is not None:
+            print(f"Preprocessing saved {saved / 1e6:.2f} MB of uploads", file=sys.stderr)
+    else:
+        print("No images found", file=sys.stderr)
+    if cache:
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['entries']} entries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
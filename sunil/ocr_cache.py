@@ -0,0 +1,111 @@
+"""Persistent, content-addressed cache of OCR.space responses.
+
+Entries are keyed by the SHA-256 of the image bytes plus the OCR language and
+engine, and hold the raw `ParsedResults` JSON, so re-running extraction on a
+known image (retries, re-parsing after pattern changes) is a local lookup
+instead of a network round trip and quota hit. Old entries expire after
+`max_age` seconds and the least recently used ones are evicted once the cache
+holds more than `max_entries` rows or `max_bytes` of JSON.
+"""
+import hashlib
+import json
+import threading
+import time
+
+DEFAULT_PATH = "ocr_cache.sqlite3"
+
+
+class OCRCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries=10000, max_age=30 * 24 * 3600, max_bytes=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        import sqlite3      # not needed just to compute keys
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                key TEXT PRIMARY KEY,
+                parsed_results TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def key(image_bytes, language="eng", engine=2):
+        digest = hashlib.sha256(image_bytes)
+        digest.update(f"\0{language}\0{engine}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached ParsedResults list, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT parsed_results, created FROM ocr_cache WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or (self.max_age and now - row[1] > self.max_age):
+                if row is not None:
+                    self._db.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, parsed_results):
+        blob = json.dumps(parsed_results, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, parsed_results, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now))
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        db = self._db
+        if self.max_age:
+            self.evictions += db.execute("DELETE FROM ocr_cache WHERE created < ?",
+                                         (now - self.max_age,)).rowcount
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+        if self.max_entries and count > self.max_entries:
+            self.evictions += db.execute(
+                "DELETE FROM ocr_cache WHERE key IN "
+                "(SELECT key FROM ocr_cache ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)).rowcount
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            # Walk from least recently used until enough bytes are freed
+            freed = 0
+            doomed = []
+            for key, size in db.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+                if total - freed <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                freed += size
+            db.executemany("DELETE FROM ocr_cache WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": count, "bytes": total}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,75 @@
+"""Optional client-side image preprocessing before the OCR upload.
+
+Phone photos of a card are often several megabytes, which dominates upload
+time and can exceed the OCR service's file size limit. The image is optionally
+cropped to the card, converted to grayscale, downscaled so its long edge
+matches a target size (or DPI for a standard 85.6 mm card) and re-encoded as
+JPEG. If that does not make the file smaller, the original bytes are kept.
+"""
+import time
+
+from common import metrics
+
+CARD_WIDTH_INCHES = 85.6 / 25.4     # ID-1 card, long edge
+
+
+def long_edge_for_dpi(dpi):
+    return int(round(dpi * CARD_WIDTH_INCHES))
+
+
+def _crop_to_card(image, cv2):
+    """Crop to the largest roughly rectangular contour covering >= 20% of the image"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None, iterations=2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    height, width = gray.shape[:2]
+    best = None
+    for contour in contours:
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        area = cv2.contourArea(approx)
+        if len(approx) == 4 and area >= 0.2 * width * height and (best is None or area > best[0]):
+            best = (area, cv2.boundingRect(approx))
+    if best is None:
+        return image, False
+    x, y, w, h = best[1]
+    return image[y:y+h, x:x+w], True
+
+
+def preprocess_image(image_bytes, long_edge=1600, dpi=None, grayscale=True, crop=False,
+                     jpeg_quality=80):
+    """Return (bytes_to_upload, info) for an encoded image"""
+    # OpenCV is only needed when preprocessing is switched on
+    import cv2
+    import numpy as np
+
+    started = time.perf_counter()
+    info = {"original_bytes": len(image_bytes), "bytes": len(image_bytes), "saved_bytes": 0,
+            "cropped": False, "size": None, "preprocess_ms": 0.0, "applied": False}
+    flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), flags)
+    if image is None:
+        # Not an image OpenCV can read (e.g. a PDF): upload as-is
+        info["preprocess_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return image_bytes, info
+
+    if crop:
+        image, info["cropped"] = _crop_to_card(image, cv2)
+    if dpi:
+        long_edge = long_edge_for_dpi(dpi)
+    height, width = image.shape[:2]
+    scale = long_edge / max(height, width) if long_edge else 1.0
+    if scale < 1.0:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)),
+                           interpolation=cv2.INTER_AREA)
+    info["size"] = (image.shape[1], image.shape[0])
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    elapsed = time.perf_counter() - started
+    metrics.record("ocr.preprocess", elapsed)
+    info["preprocess_ms"] = round(elapsed * 1000, 1)
+    if not ok or len(encoded) >= len(image_bytes):
+        return image_bytes, info
+    data = encoded.tobytes()
+    info.update(bytes=len(data), saved_bytes=len(image_bytes) - len(data), applied=True)
+    return data, info
@@ -0,0 +1,204 @@
+"""Re-run field extraction over archived OCR text.
+
+After a pattern change, re-parse every stored OCR text with the current
+parse_aadhaar_text() and compare against the previous run:
+
+    python -m sunil.reparse results.jsonl --out fields_new.jsonl --baseline fields_old.jsonl \
+        --diff changes.jsonl --stats stats.json --workers 8
+
+The archive is either JSONL (one object per line with a "text" field, e.g. the
+output of sunil.ocr_batch; the id is taken from "id", "path" or "key", else the
+line number) or an SQLite file such as the OCR cache. Documents are streamed in
+chunks through a process pool with a bounded number of chunks in flight, and
+results are written in archive order, so the baseline is read alongside
+instead of being loaded into memory. Memory use does not grow with the size
+of the archive.
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sunil.aadhaar_fields import FIELDS, parse_aadhaar_text
+
+CACHE_QUERY = "SELECT key, parsed_results FROM ocr_cache"
+
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            doc_id = record.get("id") or record.get("path") or record.get("key") or str(number)
+            yield doc_id, record.get("text")
+
+
+def iter_jsonl_results(path):
+    """Yield (id, fields) from a previous --out file"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["id"], record["fields"]
+
+
+def iter_sqlite(path, query=CACHE_QUERY):
+    """Yield (id, text) rows; cache rows hold ParsedResults JSON, other queries plain text"""
+    db = sqlite3.connect(path)
+    try:
+        for doc_id, value in db.execute(query):
+            if query == CACHE_QUERY:
+                results = json.loads(value)
+                value = results[0].get("ParsedText", "") if results else None
+            yield str(doc_id), value
+    finally:
+        db.close()
+
+
+def iter_archive(path, query=None):
+    if os.path.splitext(path)[1].lower() in (".sqlite", ".sqlite3", ".db"):
+        return iter_sqlite(path, query or CACHE_QUERY)
+    return iter_jsonl(path)
+
+
+def parse_chunk(chunk):
+    """Worker: parse a list of (id, text); one task per chunk keeps pickling overhead low"""
+    return [(doc_id, parse_aadhaar_text(text) if text else None) for doc_id, text in chunk]
+
+
+def reparse(docs, workers=None, chunk_size=500, in_flight=None):
+    """Yield (id, fields) in input order; fields is None for documents without text"""
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or workers * 2
+    docs = iter(docs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            chunk = list(itertools.islice(docs, chunk_size))
+            if chunk:
+                pending.append(pool.submit(parse_chunk, chunk))
+            # Drain the oldest chunk once the window is full (or the input ran out)
+            while pending and (len(pending) >= in_flight or not chunk):
+                yield from pending.popleft().result()
+            if not chunk:
+                break
+
+
+class FieldStats:
+    """Per-field hit counts, plus per-field changes against a baseline run"""
+
+    def __init__(self):
+        self.docs = 0
+        self.empty = 0
+        self.hits = dict.fromkeys(FIELDS, 0)
+        self.compared = 0
+        self.changed = dict.fromkeys(FIELDS, 0)
+        self.gained = dict.fromkeys(FIELDS, 0)
+        self.lost = dict.fromkeys(FIELDS, 0)
+
+    def add(self, fields):
+        self.docs += 1
+        if fields is None:
+            self.empty += 1
+            return
+        for field in FIELDS:
+            if fields.get(field):
+                self.hits[field] += 1
+
+    def compare(self, old, new):
+        """Count and return [(field, old, new)] for every field that differs"""
+        self.compared += 1
+        old, new = old or {}, new or {}
+        changes = []
+        for field in FIELDS:
+            before, after = old.get(field), new.get(field)
+            if before == after:
+                continue
+            changes.append((field, before, after))
+            if not before:
+                self.gained[field] += 1
+            elif not after:
+                self.lost[field] += 1
+            else:
+                self.changed[field] += 1
+        return changes
+
+    def report(self):
+        parsed = self.docs - self.empty
+        report = {"docs": self.docs, "empty": self.empty, "fields": {}}
+        for field in FIELDS:
+            entry = {"hits": self.hits[field],
+                     "hit_rate": round(self.hits[field] / parsed, 4) if parsed else 0.0}
+            if self.compared:
+                entry.update(gained=self.gained[field], lost=self.lost[field],
+                             changed=self.changed[field])
+            report["fields"][field] = entry
+        if self.compared:
+            report["compared"] = self.compared
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse archived Aadhaar OCR text")
+    parser.add_argument("archive", help="JSONL with a 'text' field, or an SQLite file (.sqlite/.db)")
+    parser.add_argument("--query", default=None,
+                        help="SQLite query returning (id, text) rows (default: OCR cache table)")
+    parser.add_argument("--out", default=None, help="write {id, fields} JSONL here")
+    parser.add_argument("--baseline", default=None, help="--out file of a previous run to diff against")
+    parser.add_argument("--diff", default=None, help="write field-level changes as JSONL here")
+    parser.add_argument("--stats", default=None, help="write hit-rate/diff statistics as JSON here")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    stats = FieldStats()
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    diff = open(args.diff, "w", encoding="utf-8") if args.diff else None
+    baseline = iter_jsonl_results(args.baseline) if args.baseline else None
+    started = time.perf_counter()
+    try:
+        for doc_id, fields in reparse(iter_archive(args.archive, args.query), args.workers,
+                                      args.chunk_size):
+            stats.add(fields)
+            if out:
+                out.write(json.dumps({"id": doc_id, "fields": fields}, ensure_ascii=False) + "\n")
+            if baseline is not None:
+                base_id, base_fields = next(baseline, (None, None))
+                if base_id != doc_id:
+                    sys.exit(f"❌ Baseline does not match the archive at {doc_id!r} "
+                             f"(baseline has {base_id!r}); re-run the baseline on the same archive")
+                changes = stats.compare(base_fields, fields)
+                if diff:
+                    for field, before, after in changes:
+                        diff.write(json.dumps({"id": doc_id, "field": field, "baseline": before,
+                                               "current": after}, ensure_ascii=False) + "\n")
+    finally:
+        for f in (out, diff):
+            if f:
+                f.close()
+    elapsed = time.perf_counter() - started
+
+    report = stats.report()
+    report["elapsed"] = round(elapsed, 2)
+    report["docs_per_sec"] = round(stats.docs / elapsed, 1) if elapsed else 0.0
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"✓ Re-parsed {stats.docs} documents in {elapsed:.2f}s "
+          f"({report['docs_per_sec']:.0f} docs/sec, {stats.empty} without text)", file=sys.stderr)
+    for field, entry in report["fields"].items():
+        line = f"  {field:<15} {entry['hit_rate']:7.1%}"
+        if stats.compared:
+            line += f"  +{entry['gained']} -{entry['lost']} ~{entry['changed']}"
+        print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
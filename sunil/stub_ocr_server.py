@@ -0,0 +1,123 @@
+"""Local stand-in for the OCR.space parse endpoint.
+
+Answers every POST with an OCR.space-shaped JSON response after a configurable
+delay (plus a simulated upload time when `bandwidth` is set), and returns HTTP
+429 once more than `max_rps` requests arrive in one second, so batch
+throughput and 429 handling can be measured without the real API or quota.
+
+    python -m sunil.stub_ocr_server --port 8765 --latency 0.3 --max-rps 10
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_TEXTS = [
+    "Government of India\nEnrolment No.: 1234/56789/01234\nTo\nRavi Kumar Sharma\n"
+    "C/O: Mohan Sharma, 12 MG Road,\nAndheri East\nVTC: Mumbai, PO: Andheri, Sub District: Andheri,\n"
+    "District: Mumbai, State: Maharashtra, PIN Code: 400069\nMobile: 9876543210\n"
+    "DOB: 12/05/1990\nMale\n1234 5678 9012",
+    "Government of India\nTo\nPriya Patel\nC/O: Suresh Patel, 45 Station Road,\n"
+    "VTC: Surat, PO: Surat, Sub District: Surat,\nDistrict: Surat, State: Gujarat, PIN Code: 395003\n"
+    "DOB: 03/11/1987\nFemale\n4321 8765 2109",
+]
+
+
+class StubOCRHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        if not server.admit():
+            self._reply(429, b"You may only perform this action upto maximum requests per second",
+                        {"Retry-After": "1", "Content-Type": "text/plain"})
+            return
+        time.sleep(server.latency + (len(body) / server.bandwidth if server.bandwidth else 0))
+        text = server.texts[zlib.crc32(body) % len(server.texts)]
+        data = {
+            "ParsedResults": [{"ParsedText": text, "ErrorMessage": "", "FileParseExitCode": 1}],
+            "OCRExitCode": 1,
+            "IsErroredOnProcessing": False,
+            "ProcessingTimeInMilliseconds": str(int(server.latency * 1000)),
+        }
+        self._reply(200, json.dumps(data).encode(), {"Content-Type": "application/json"})
+
+    def _reply(self, status, payload, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOCRServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 makes the stub itself reset connections under load
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.05, max_rps=None, texts=None, bandwidth=None):
+        super().__init__(address, StubOCRHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes/sec, None = instant upload
+        self.max_rps = max_rps
+        self.texts = texts or SAMPLE_TEXTS
+        self.requests = 0
+        self.throttled = 0
+        self._window = (0, 0)   # (second, requests admitted in it)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/parse/image"
+
+    def admit(self):
+        with self._lock:
+            self.requests += 1
+            second = int(time.monotonic())
+            start, count = self._window
+            if second != start:
+                start, count = second, 0
+            if self.max_rps is not None and count >= self.max_rps:
+                self.throttled += 1
+                return False
+            self._window = (start, count + 1)
+            return True
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.05, max_rps=None, texts=None,
+                      bandwidth=None):
+    """Start a stub server on a background thread; call .shutdown() when done"""
+    server = StubOCRServer((host, port), latency, max_rps, texts, bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OCR.space server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per request")
+    parser.add_argument("--max-rps", type=int, default=None, help="answer 429 above this rate")
+    parser.add_argument("--bandwidth", type=float, default=None, help="simulated upload bytes/sec")
+    args = parser.parse_args()
+
+    server = StubOCRServer((args.host, args.port), args.latency, args.max_rps,
+                           bandwidth=args.bandwidth)
+    print(f"Stub OCR server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.requests} requests ({server.throttled} throttled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""OTP issue/validation and OTP mail delivery.
+
+Importing the package loads nothing; `from vicky import OTPManager` needs
+only the standard library, and smtplib/ssl are imported once mail is sent.
+"""
+from common.lazy import lazy_exports
+
+__all__ = ["OTPManager", "AsyncOTPManager", "deliver_otp", "send_email", "OTPStore",
+           "MemoryBackend", "SQLiteBackend", "RedisBackend", "SMTPPool", "DeliveryQueue",
+           "RateLimiter", "TokenBucket", "SlidingWindow", "default_rate_limiter"]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "OTPManager": "vicky.otp_email",
+    "AsyncOTPManager": "vicky.otp_email",
+    "deliver_otp": "vicky.otp_email",
+    "send_email": "vicky.otp_email",
+    "OTPStore": "vicky.otp_store",
+    "MemoryBackend": "vicky.otp_backends",
+    "SQLiteBackend": "vicky.otp_backends",
+    "RedisBackend": "vicky.otp_backends",
+    "SMTPPool": "vicky.smtp_pool",
+    "DeliveryQueue": "vicky.otp_delivery",
+    "RateLimiter": "vicky.rate_limit",
+    "TokenBucket": "vicky.rate_limit",
+    "SlidingWindow": "vicky.rate_limit",
+    "default_rate_limiter": "vicky.rate_limit",
+})
@@ -0,0 +1,176 @@
+"""Per-operation latency of the OTP backends.
+
+    python -m vicky.bench_otp_backends                      # memory, SQLite, Redis
+    python -m vicky.bench_otp_backends --redis 127.0.0.1:6379 --ops 20000
+
+For each backend, first checks that state is really shared: an OTP issued
+in this process is verified by a second worker process with its own backend
+instance, and a second request for the email from that worker is refused by
+the cooldown, and that wrong guesses burn the OTP after max_attempts. Then
+times single-threaded issue and verify calls and reports p50/p95/p99 latency
+in microseconds.
+
+Without --redis a local redis-server is started if one is installed, so the
+Lua scripts really run; otherwise the stub server stands in, which answers
+EVALSHA with Python copies of the scripts and so does not test the Lua.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+
+from vicky.otp_backends import (INVALID, LOCKED, MISSING, VERIFIED, MemoryBackend, RedisBackend,
+                                 RespConnection, SQLiteBackend)
+from vicky.otp_email import OTPManager
+from vicky.stub_redis_server import start_stub_server
+
+
+def _worker(make_backend, email, otp, queue):
+    manager = OTPManager(backend=make_backend())
+    try:
+        queue.put((manager.generate_otp(email)[0], manager.validate_otp(email, otp)[0]))
+    finally:
+        manager.close()
+
+
+def shared_check(make_backend):
+    """True if a second process sees the OTP issued here"""
+    manager = OTPManager(backend=make_backend())
+    email = f"shared-{os.getpid()}-{time.time_ns()}@example.com"
+    otp, _ = manager.generate_otp(email)
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_worker, args=(make_backend, email, otp, queue))
+    proc.start()
+    proc.join()
+    manager.close()
+    reissued, verified = queue.get()
+    return reissued is None and verified
+
+
+def lockout_check(backend):
+    """True if max_attempts wrong OTPs burn the OTP, so the right one no longer verifies"""
+    email = f"guess-{os.getpid()}-{time.time_ns()}@example.com"
+    backend.issue(email, 123456)
+    statuses = [backend.verify(email, str(100000 + i)) for i in range(backend.max_attempts)]
+    expected = [INVALID] * (backend.max_attempts - 1) + [LOCKED]
+    return statuses == expected and backend.verify(email, "123456") == MISSING
+
+
+def latencies(backend, ops):
+    """(issue µs, verify µs) lists for `ops` distinct emails"""
+    issue, verify = [], []
+    emails = [f"bench{i}-{time.time_ns()}@example.com" for i in range(ops)]
+    for i, email in enumerate(emails):
+        t0 = time.perf_counter()
+        backend.issue(email, 100000 + i)
+        t1 = time.perf_counter()
+        status = backend.verify(email, str(100000 + i))
+        t2 = time.perf_counter()
+        if status != VERIFIED:
+            raise SystemExit(f"❌ {type(backend).__name__} did not verify a fresh OTP: {status}")
+        issue.append((t1 - t0) * 1e6)
+        verify.append((t2 - t1) * 1e6)
+    return issue, verify
+
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100)
+    return cuts[49], cuts[94], cuts[98]
+
+
+class SQLiteFactory:
+    """Picklable backend factory, so worker processes open their own connection"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self):
+        return SQLiteBackend(self.path)
+
+
+class RedisFactory:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+
+    def __call__(self):
+        return RedisBackend(self.host, self.port)
+
+
+def start_redis_server(timeout=5.0):
+    """A throwaway redis-server on a free port, or None if it is not installed"""
+    binary = shutil.which("redis-server")
+    if binary is None:
+        return None, None
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen([binary, "--port", str(port), "--bind", "127.0.0.1", "--save", "",
+                             "--appendonly", "no"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = RespConnection("127.0.0.1", port, timeout=1.0)
+            conn.command("PING")
+            conn.close()
+            return proc, port
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OTP backend latency benchmark")
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--redis", default=None, help="host:port of a real server (default: stub)")
+    args = parser.parse_args()
+
+    stub = server = None
+    if args.redis:
+        host, port = args.redis.rsplit(":", 1)
+        redis, redis_name = RedisFactory(host, int(port)), "redis"
+    else:
+        server, port = start_redis_server()
+        if server is not None:
+            redis, redis_name = RedisFactory("127.0.0.1", port), "redis (local)"
+        else:
+            stub = start_stub_server()
+            redis, redis_name = RedisFactory(*stub.server_address[:2]), "redis (stub)"
+            print("⚠️ redis-server not found: the stub runs Python copies of ISSUE_SCRIPT/"
+                  "VERIFY_SCRIPT, so the Lua scripts are not tested (use --redis host:port)")
+    tmp = tempfile.TemporaryDirectory()
+    factories = {"memory": MemoryBackend, "sqlite": SQLiteFactory(os.path.join(tmp.name, "otp.db")),
+                 redis_name: redis}
+
+    try:
+        print(f"{'backend':<14} {'shared':>6} {'issue p50/p95/p99 µs':>24} {'verify p50/p95/p99 µs':>24}")
+        for name, factory in factories.items():
+            shared = "-" if factory is MemoryBackend else ("yes" if shared_check(factory) else "NO")
+            backend = factory()
+            try:
+                if not lockout_check(backend):
+                    raise SystemExit(f"❌ {name}: wrong OTPs did not burn the OTP")
+                issue, verify = latencies(backend, args.ops)
+            finally:
+                backend.close()
+            cols = ["/".join(f"{v:.0f}" for v in percentiles(values)) for values in (issue, verify)]
+            print(f"{name:<14} {shared:>6} {cols[0]:>24} {cols[1]:>24}", flush=True)
+            if shared == "NO":
+                raise SystemExit(f"❌ {name}: a second process did not see the OTP")
+    finally:
+        if stub:
+            stub.shutdown()
+        if server:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Contention benchmark for the sharded OTPManager.
+
+    python -m vicky.bench_otp_concurrency
+    python -m vicky.bench_otp_concurrency --threads 1 4 16 32 --shards 1 16 64 --ops 50000
+
+Each thread issues and validates OTPs for its own slice of emails, and the
+run reports total ops/sec per thread count for each shard count. Before
+that, two race checks must pass: many threads validating the same OTP at
+once verify it exactly once, and many threads requesting an OTP for the same
+email get exactly one past the cooldown. The same checks run for the
+asyncio variant with concurrent tasks.
+
+On a GIL build the threads take turns executing, so ops/sec cannot grow
+with threads; what the benchmark shows there is that lock contention does
+not make it collapse. On a free-threaded build (python3.13t) more shards
+let throughput scale with threads.
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+from vicky.otp_email import AsyncOTPManager, OTPManager
+
+
+def race_check(manager, threads=32):
+    """Return (#successful validations of one OTP, #OTPs issued for one email)"""
+    barrier = threading.Barrier(threads)
+    otp, _ = manager.generate_otp("race@example.com")
+    verified, issued = [], []
+
+    def validate():
+        barrier.wait()
+        verified.append(manager.validate_otp("race@example.com", otp)[0])
+
+    def generate():
+        barrier.wait()
+        issued.append(manager.generate_otp("burst@example.com")[0] is not None)
+
+    for target in (validate, generate):
+        workers = [threading.Thread(target=target) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return sum(verified), sum(issued)
+
+
+async def async_race_check(manager, tasks=32):
+    otp, _ = await manager.generate_otp("race@example.com")
+    verified = await asyncio.gather(*(manager.validate_otp("race@example.com", otp) for _ in range(tasks)))
+    issued = await asyncio.gather(*(manager.generate_otp("burst@example.com") for _ in range(tasks)))
+    return sum(ok for ok, _ in verified), sum(otp is not None for otp, _ in issued)
+
+
+def ops_per_sec(shards, threads, ops):
+    """Each thread does `ops` generate+validate pairs on its own emails"""
+    manager = OTPManager(cooldown_time=0, shards=shards)
+    barrier = threading.Barrier(threads + 1)
+
+    def work(worker):
+        emails = [f"user{worker}-{i}@example.com" for i in range(1000)]
+        barrier.wait()
+        for i in range(ops):
+            email = emails[i % 1000]
+            otp, _ = manager.generate_otp(email)
+            manager.validate_otp(email, otp)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return 2 * ops * threads / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OTPManager contention benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--ops", type=int, default=20000, help="generate+validate pairs per thread")
+    args = parser.parse_args()
+
+    verified, issued = race_check(OTPManager())
+    async_verified, async_issued = asyncio.run(async_race_check(AsyncOTPManager()))
+    print(f"Race check: one OTP verified {verified}x (async {async_verified}x), "
+          f"one email issued {issued}x (async {async_issued}x)")
+    if (verified, issued, async_verified, async_issued) != (1, 1, 1, 1):
+        raise SystemExit("❌ Concurrent requests for one email were not serialised")
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>7} " + " ".join(f"{f'{n} shard(s)':>14}" for n in args.shards))
+    for threads in args.threads:
+        row = [ops_per_sec(shards, threads, args.ops) for shards in args.shards]
+        print(f"{threads:>7} " + " ".join(f"{rate:>10,.0f} op/s" for rate in row), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Load generator for the OTP subsystem, with JSON results for regression tracking.
+
+    python -m vicky.bench_otp_load --out otp_load.json
+    python -m vicky.bench_otp_load --emails 1000 1000000 10000000 --ratios 1 4 --threads 1 8 32
+
+For every combination of distinct emails x validate:generate ratio x threads
+it runs --ops operations against one OTPManager: each picks a random email,
+and either issues an OTP or validates one (half the time with the right
+code, so both the success and the failure path are exercised). It reports
+ops/sec, p50/p95/p99 latency per operation type, and the resident memory
+sampled while it runs (start, peak, end, growth).
+
+A separate end-to-end run issues a burst of --mails OTPs and hands them to
+the delivery queue, which mails them through an SMTPPool to a local stub SMTP
+server, and reports the issue->delivered latency percentiles (queueing
+included).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from array import array
+
+from vicky.otp_delivery import DELIVERED, DeliveryQueue
+from vicky.otp_email import OTPManager, deliver_otp
+from vicky.smtp_pool import SMTPPool
+from vicky.stub_smtp_server import start_stub_server
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []       # [(seconds since start, MB)]
+        self._done = threading.Event()
+        self._start = time.perf_counter()
+
+    def run(self):
+        while True:
+            self.samples.append((round(time.perf_counter() - self._start, 2), round(rss_mb(), 1)))
+            if self._done.wait(self.interval):
+                break
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.samples.append((round(time.perf_counter() - self._start, 2), round(rss_mb(), 1)))
+        values = [mb for _, mb in self.samples]
+        return {"start_mb": values[0], "peak_mb": max(values), "end_mb": values[-1],
+                "growth_mb": round(values[-1] - values[0], 1), "samples": self.samples}
+
+
+def percentiles_ms(latencies):
+    if len(latencies) < 2:
+        return None
+    cuts = statistics.quantiles(latencies, n=100)
+    return {"p50": round(cuts[49] * 1000, 4), "p95": round(cuts[94] * 1000, 4),
+            "p99": round(cuts[98] * 1000, 4)}
+
+
+def run_scenario(emails, ratio, threads, ops, cooldown, seed):
+    # Room for every email even when the shards fill unevenly, so nothing is evicted
+    manager = OTPManager(cooldown_time=cooldown, max_entries=max(2 * emails, 1_000_000))
+    per_thread = ops // threads
+    generate_lat = [[] for _ in range(threads)]
+    validate_lat = [[] for _ in range(threads)]
+    verified = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+    p_validate = ratio / (1 + ratio)
+
+    def work(n):
+        rng = random.Random(seed + n)
+        # Thread n owns the emails with index % threads == n and remembers their last OTP
+        owned = max(1, (emails - n + threads - 1) // threads)
+        issued = array("i", bytes(4 * owned))
+        gen, val = generate_lat[n], validate_lat[n]
+        barrier.wait()
+        for _ in range(per_thread):
+            slot = rng.randrange(owned)
+            email = f"user{slot * threads + n}@example.com"
+            if rng.random() < p_validate:
+                code = str(issued[slot]) if rng.random() < 0.5 else "000000"
+                t0 = time.perf_counter()
+                ok, _ = manager.validate_otp(email, code)
+                val.append(time.perf_counter() - t0)
+                verified[n] += ok
+            else:
+                t0 = time.perf_counter()
+                otp, _ = manager.generate_otp(email)
+                gen.append(time.perf_counter() - t0)
+                if otp:
+                    issued[slot] = int(otp)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    sampler = RSSSampler()
+    sampler.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - t0
+    memory = sampler.stop()
+
+    generate = [x for lat in generate_lat for x in lat]
+    validate = [x for lat in validate_lat for x in lat]
+    return {
+        "emails": emails, "validate_per_generate": ratio, "threads": threads,
+        "ops": per_thread * threads, "elapsed_s": round(elapsed, 3),
+        "ops_per_sec": round(per_thread * threads / elapsed, 1),
+        "generate": {"count": len(generate), "latency_ms": percentiles_ms(generate)},
+        "validate": {"count": len(validate), "verified": sum(verified),
+                     "latency_ms": percentiles_ms(validate)},
+        "store": manager.stats(), "memory": memory,
+    }
+
+
+def run_delivery(mails, workers, connections, handshake, auth, latency):
+    server = start_stub_server(handshake=handshake, auth=auth, latency=latency)
+    host, port = server.server_address[:2]
+    manager = OTPManager(cooldown_time=0)
+    pool = SMTPPool(host, port, "otp@example.com", "secret", starttls=False,
+                    max_connections=connections)
+    queue = DeliveryQueue(lambda email, otp: deliver_otp(email, otp, pool), workers=workers)
+    try:
+        jobs = []
+        t0 = time.perf_counter()
+        for i in range(mails):
+            issued = time.monotonic()     # the clock DeliveryJob uses
+            email = f"user{i}@example.com"
+            otp, _ = manager.generate_otp(email)
+            jobs.append((issued, queue.submit(email, otp, expires_at=time.monotonic() + manager.expiry_time)))
+        latencies = []
+        for issued, job in jobs:
+            job.wait()
+            if job.status == DELIVERED:
+                # From the generate_otp call to the SMTP server accepting the mail
+                latencies.append(job.latency + job.submitted - issued)
+        elapsed = time.perf_counter() - t0
+        return {"mails": mails, "delivered": len(latencies), "workers": workers,
+                "connections": connections, "elapsed_s": round(elapsed, 3),
+                "mails_per_sec": round(len(latencies) / elapsed, 1),
+                "issue_to_delivered_ms": percentiles_ms(latencies),
+                "queue": queue.stats(), "pool": pool.stats(),
+                "stub": {"handshake_s": handshake, "auth_s": auth, "latency_s": latency}}
+    finally:
+        queue.close()
+        pool.close()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OTP subsystem load benchmark")
+    parser.add_argument("--emails", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--ratios", type=float, nargs="+", default=[1, 4],
+                        help="validate:generate ratios")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--ops", type=int, default=200_000, help="operations per scenario")
+    parser.add_argument("--cooldown", type=float, default=0,
+                        help="cooldown seconds (0 = every generate issues an OTP)")
+    parser.add_argument("--mails", type=int, default=500, help="end-to-end mails (0 = skip)")
+    parser.add_argument("--delivery-workers", type=int, default=8)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="write results as JSON here")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "args": vars(args)},
+        "scenarios": [],
+    }
+    print(f"{'emails':>9} {'v:g':>4} {'thr':>4} {'ops/sec':>10} {'gen p99 ms':>11} "
+          f"{'val p99 ms':>11} {'RSS MB':>8} {'growth':>7}")
+    for emails in args.emails:
+        for ratio in args.ratios:
+            for threads in args.threads:
+                result = run_scenario(emails, ratio, threads, args.ops, args.cooldown, args.seed)
+                results["scenarios"].append(result)
+                gen, val = result["generate"]["latency_ms"], result["validate"]["latency_ms"]
+                print(f"{emails:>9} {ratio:>4g} {threads:>4} {result['ops_per_sec']:>10,.0f} "
+                      f"{gen['p99'] if gen else 0:>11.4f} {val['p99'] if val else 0:>11.4f} "
+                      f"{result['memory']['peak_mb']:>8.1f} {result['memory']['growth_mb']:>+7.1f}",
+                      flush=True)
+
+    if args.mails:
+        delivery = run_delivery(args.mails, args.delivery_workers, args.connections,
+                                handshake=0.05, auth=0.05, latency=0.002)
+        results["delivery"] = delivery
+        lat = delivery["issue_to_delivered_ms"]
+        print(f"End-to-end: {delivery['delivered']}/{delivery['mails']} mails, "
+              f"{delivery['mails_per_sec']:.0f} mails/sec, issue->delivered "
+              f"p50 {lat['p50']:.1f} ms p95 {lat['p95']:.1f} ms p99 {lat['p99']:.1f} ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Memory and speed of the OTP store under a signup flood.
+
+    python -m vicky.bench_otp_store                    # 1,000,000 emails
+    python -m vicky.bench_otp_store --emails 200000 --cap 50000
+
+Fills an OTPStore with distinct emails (as a flood of first-time signups
+would) and reports the bytes traced by tracemalloc per active email, not
+counting the email strings, which belong to the caller. Then it advances a
+fake clock past every deadline and checks that the store empties, and finally
+shows that with --cap the store never grows past the cap.
+"""
+import argparse
+import time
+import tracemalloc
+
+from vicky.otp_store import OTPStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OTP store memory benchmark")
+    parser.add_argument("--emails", type=int, default=1_000_000)
+    parser.add_argument("--cap", type=int, default=100_000, help="max_entries for the capped run")
+    args = parser.parse_args()
+
+    emails = [f"user{i}@example.com" for i in range(args.emails)]
+    clock = FakeClock()
+    store = OTPStore(max_entries=args.emails, clock=clock)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    for i, email in enumerate(emails):
+        clock.now = i * 1e-6
+        store.put(email, 100000 + i % 900000, clock.now)
+    elapsed = time.perf_counter() - t0
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    per_email = used / args.emails
+    print(f"{args.emails} active emails: {used / 1e6:.1f} MB, {per_email:.0f} bytes/email "
+          f"(~{per_email:.0f} MB per million), {args.emails / elapsed:,.0f} puts/sec")
+
+    clock.now += store.expiry_time + store.keep_expired + store.cooldown_time
+    t0 = time.perf_counter()
+    store.purge()
+    print(f"Purged {store.stats()['expired']} expired records in {time.perf_counter() - t0:.2f}s, "
+          f"{len(store)} left")
+
+    capped = OTPStore(max_entries=args.cap, clock=clock)
+    for email in emails:
+        capped.put(email, 123456, clock.now)
+    stats = capped.stats()
+    print(f"Cap {args.cap}: size {stats['size']}, peak {stats['peak']}, evicted {stats['evicted']}")
+    if len(store) or stats["peak"] > args.cap:
+        raise SystemExit("❌ Store did not stay bounded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Cost of the OTP rate limiter per request.
+
+    python -m vicky.bench_rate_limit
+    python -m vicky.bench_rate_limit --keys 1000000 --checks 500000
+
+Times RateLimiter.check() for a single token-bucket rule, a single
+sliding-window rule and the default email+IP+global policy, once with one
+hot key (refused after its first few requests) and once spread over --keys
+distinct emails/IPs, and reports the mean and p99 cost in microseconds. Then
+it measures memory per tracked key with tracemalloc and checks that idle keys
+expire once the clock moves on, that resend presses refused by the OTP
+cooldown do not use up the email's allowance, and that a burst of concurrent
+requests from one IP cannot get past its limit. Fails if a check averages
+more than --max-us microseconds.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+
+from vicky.otp_backends import MemoryBackend
+from vicky.otp_email import OTPManager
+from vicky.rate_limit import RateLimiter, SlidingWindow, TokenBucket, default_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def policies():
+    return {
+        "token bucket": lambda: RateLimiter({"email": TokenBucket(5, 5 / 3600)}),
+        "sliding window": lambda: RateLimiter({"email": SlidingWindow(20, 600)}),
+        "email+ip+global": default_rate_limiter,
+    }
+
+
+def time_checks(limiter, emails, ips, checks):
+    """(mean µs, p99 µs) per check; p99 from batches of 100 to keep timer overhead out"""
+    batches = []
+    check = limiter.check
+    for start in range(0, checks, 100):
+        t0 = time.perf_counter()
+        for i in range(start, start + 100):
+            check(email=emails[i % len(emails)], ip=ips[i % len(ips)])
+        batches.append((time.perf_counter() - t0) / 100 * 1e6)
+    return statistics.fmean(batches), statistics.quantiles(batches, n=100)[98]
+
+
+def cooldown_check(cooldown=0.1, presses=10):
+    """OTPs issued to one email pressing resend through 5 cooldowns (5 = all of them)"""
+    manager = OTPManager(cooldown_time=cooldown, rate_limiter=default_rate_limiter())
+    issued = 0
+    for _ in range(5):
+        otp, _ = manager.generate_otp("resend@example.com", "10.0.0.1")
+        issued += otp is not None
+        for _ in range(presses):
+            manager.generate_otp("resend@example.com", "10.0.0.1")     # refused: cooldown
+        time.sleep(cooldown * 1.1)
+    return issued
+
+
+class SlowBackend(MemoryBackend):
+    """A memory backend with a network round trip's latency, as SQLite/Redis have"""
+
+    def issue(self, email, otp):
+        time.sleep(0.01)
+        return super().issue(email, otp)
+
+
+def burst_check(requests=50, limit=20):
+    """OTPs issued to `requests` concurrent requests from one IP allowed `limit`"""
+    manager = OTPManager(backend=SlowBackend(cooldown_time=0),
+                         rate_limiter=RateLimiter({"ip": SlidingWindow(limit, 600)}))
+    start = threading.Barrier(requests)
+    issued = []
+
+    def request(i):
+        start.wait()
+        otp, _ = manager.generate_otp(f"burst{i}@example.com", "10.0.0.9")
+        issued.append(otp is not None)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(issued)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiter benchmark")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--max-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    emails = [f"user{i}@example.com" for i in range(args.keys)]
+    ips = [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(args.keys)]
+    slow = []
+    print(f"{'policy':<16} {'keys':>8} {'mean µs':>8} {'p99 µs':>8}")
+    for name, make in policies().items():
+        for label, keys in (("1", (emails[:1], ips[:1])), (f"{args.keys}", (emails, ips))):
+            mean, p99 = time_checks(make(), *keys, args.checks)
+            print(f"{name:<16} {label:>8} {mean:8.2f} {p99:8.2f}", flush=True)
+            if mean > args.max_us:
+                slow.append(name)
+
+    clock = FakeClock()
+    limiter = default_rate_limiter()
+    limiter.clock = clock
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for email, ip in zip(emails, ips):
+        clock.now += 0.01       # stay under the global rate so every key gets tracked
+        limiter.check(email=email, ip=ip)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    keys = sum(limiter.stats()["keys"].values())
+    print(f"Memory: {used / keys:.0f} bytes per tracked key ({keys} keys, excluding the key strings)")
+
+    # Two idle periods of the longest rule later, every key must be gone
+    clock.now += 2 * 3600 + 1
+    limiter.check(email="late@example.com", ip="10.0.0.1")
+    clock.now += 3600 + 1
+    limiter.check(email="later@example.com", ip="10.0.0.2")
+    left = limiter.stats()["keys"]
+    print(f"After idling: {left}")
+    if left["email"] > 2 or left["ip"] > 2:
+        raise SystemExit("❌ Idle keys were not expired")
+
+    issued = cooldown_check()
+    print(f"Resend during cooldown: {issued}/5 OTPs issued")
+    if issued != 5:
+        raise SystemExit("❌ Requests refused by the cooldown used up the email allowance")
+    issued = burst_check()
+    print(f"Burst of 50 from one IP limited to 20: {issued} OTPs issued")
+    if issued > 20:
+        raise SystemExit("❌ Concurrent requests got past the IP limit")
+    if slow:
+        raise SystemExit(f"❌ Over {args.max_us} µs per check: {', '.join(slow)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""OTP mail throughput: a connection per mail vs the SMTP session pool.
+
+    python -m vicky.bench_smtp
+    python -m vicky.bench_smtp --mails 500 --concurrency 16 --handshake 0.2 --auth 0.1
+
+Sends the same OTP mails to a local stub SMTP server both ways, from
+`concurrency` threads, and reports mails/sec with p50/p95 send latency. The
+stub sleeps `handshake` + `auth` seconds per new session to stand in for a
+real provider's TCP/TLS handshake and login.
+
+First checks that a refused recipient is raised to the caller without a
+reconnect and that the pool keeps (and can reuse) the session.
+"""
+import argparse
+import smtplib
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from vicky.smtp_pool import SMTPPool
+from vicky.stub_smtp_server import start_stub_server
+
+SENDER = "otp@example.com"
+REFUSED = "nobody@example.com"
+
+
+def message(i):
+    return f"Subject: Your OTP Code\n\nYour OTP is {100000 + i}. It will expire in 2 minutes."
+
+
+def send_per_mail(host, port, i):
+    """What send_email used to do for every OTP"""
+    with smtplib.SMTP(host, port) as server:
+        server.login(SENDER, "secret")
+        server.sendmail(SENDER, f"user{i}@example.com", message(i))
+
+
+def refusal_check(host, port, server):
+    """None if a 550 for the recipient keeps the session, else what went wrong"""
+    before = dict(server.counters)
+    with SMTPPool(host, port, SENDER, "secret", starttls=False, max_connections=1) as pool:
+        pool.send(SENDER, ["user@example.com"], message(0))
+        try:
+            pool.send(SENDER, [REFUSED], message(1))
+            return "a refused recipient was not raised"
+        except smtplib.SMTPRecipientsRefused:
+            pass
+        pool.send(SENDER, ["user@example.com"], message(2))
+        stats = pool.stats()
+    opened = server.counters["connections"] - before["connections"]
+    logins = server.counters["logins"] - before["logins"]
+    if opened != 1 or logins != 1 or stats["reconnects"] or stats["reused"] != 2:
+        return (f"the refusal cost a session: {opened} connections, {logins} logins, "
+                f"{stats['reconnects']} reconnects, {stats['reused']} reuses")
+    return None
+
+
+def run(send, mails, concurrency):
+    def timed(i):
+        t0 = time.perf_counter()
+        send(i)
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, range(mails)))
+    elapsed = time.perf_counter() - t0
+    cuts = statistics.quantiles(latencies, n=100)
+    return mails / elapsed, cuts[49] * 1000, cuts[94] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMTP pool benchmark")
+    parser.add_argument("--mails", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--connections", type=int, default=4, help="pool size (connection cap)")
+    parser.add_argument("--handshake", type=float, default=0.15, help="stub seconds per connection")
+    parser.add_argument("--auth", type=float, default=0.1, help="stub seconds per login")
+    parser.add_argument("--latency", type=float, default=0.005, help="stub seconds per message")
+    args = parser.parse_args()
+
+    server = start_stub_server(handshake=args.handshake, auth=args.auth, latency=args.latency,
+                               refuse=[REFUSED])
+    host, port = server.server_address[:2]
+    try:
+        problem = refusal_check(host, port, server)
+        if problem:
+            raise SystemExit(f"❌ SMTPPool: {problem}")
+        results = {"per-mail": run(lambda i: send_per_mail(host, port, i), args.mails, args.concurrency)}
+        before = dict(server.counters)
+        with SMTPPool(host, port, SENDER, "secret", starttls=False,
+                      max_connections=args.connections) as pool:
+            results[f"pooled ({args.connections})"] = run(
+                lambda i: pool.send(SENDER, [f"user{i}@example.com"], message(i)),
+                args.mails, args.concurrency)
+            pool_stats = pool.stats()
+        opened = server.counters["connections"] - before["connections"]
+    finally:
+        server.shutdown()
+
+    print(f"{args.mails} mails from {args.concurrency} threads, "
+          f"stub handshake {args.handshake}s + login {args.auth}s")
+    for name, (rate, p50, p95) in results.items():
+        print(f"{name:<12} {rate:8.1f} mails/sec   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms")
+    print(f"Pool opened {opened} connections (cap {args.connections}), "
+          f"reused sessions {pool_stats['reused']} times")
+    if opened > args.connections:
+        raise SystemExit("❌ Pool opened more connections than its cap")
+
+
+if __name__ == "__main__":
+    main()
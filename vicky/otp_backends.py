@@ -0,0 +1,378 @@
+"""Where OTPManager keeps its state.
+
+Every backend offers the same two atomic operations, so issuing or checking
+an OTP is one round trip whichever backend is used:
+
+* issue(email, otp)          - set-if-not-in-cooldown: store the OTP unless
+                               the email is still cooling down; returns the
+                               seconds left to wait (0 = stored)
+* verify(email, entered_otp) - compare-and-delete: consume the OTP only if it
+                               matches and has not expired; returns VERIFIED,
+                               INVALID, EXPIRED or MISSING. Wrong OTPs are
+                               counted, and the `max_attempts`-th burns the
+                               OTP (LOCKED), so a 6-digit code cannot be
+                               guessed within its lifetime
+
+Backends:
+
+* MemoryBackend - sharded in-process OTPStores (one worker process only)
+* SQLiteBackend - a WAL-mode SQLite file shared by the worker processes on
+                  one machine; each operation is a single UPSERT/UPDATE
+* RedisBackend  - any server speaking the Redis protocol, shared by every
+                  node; each operation is one EVALSHA of a small Lua script
+                  (see vicky.stub_redis_server for a local stand-in)
+
+The shared backends use wall-clock time, so the clocks of the nodes should
+be in sync (NTP) to within a small part of the cooldown.
+"""
+import hashlib
+import socket
+import threading
+import time
+
+from vicky.otp_store import OTPStore
+
+VERIFIED, INVALID, EXPIRED, MISSING, LOCKED = "verified", "invalid", "expired", "missing", "locked"
+
+
+class OTPBackend:
+    expiry_time = 120
+    cooldown_time = 30
+    max_attempts = 5        # wrong OTPs before the OTP is burned
+    # Operations may wait on disk or the network (AsyncOTPManager offloads them)
+    blocking = True
+
+    def issue(self, email, otp):
+        raise NotImplementedError
+
+    def verify(self, email, entered_otp):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(OTPBackend):
+    """State split into `shards` TTL stores, each behind its own lock.
+
+    An email always maps to the same shard, and the cooldown check and the
+    write (or the OTP comparison and the consume) happen under that one lock,
+    while different emails rarely wait for each other.
+    """
+
+    blocking = False
+
+    def __init__(self, expiry_time=120, cooldown_time=30, max_entries=1_000_000, shards=16,
+                 max_attempts=5):
+        # max_entries is split between the shards
+        per_shard = -(-max_entries // shards)
+        self.shards = [(threading.Lock(), OTPStore(expiry_time, cooldown_time, per_shard))
+                       for _ in range(shards)]
+        self.expiry_time = expiry_time
+        self.cooldown_time = cooldown_time
+        self.max_attempts = max_attempts
+
+    def _shard(self, email):
+        return self.shards[hash(email) % len(self.shards)]
+
+    def issue(self, email, otp):
+        lock, store = self._shard(email)
+        with lock:
+            now = store.clock()
+            wait = store.cooldown_left(email, now)
+            if wait <= 0:
+                store.put(email, otp, now)
+        return wait
+
+    def verify(self, email, entered_otp):
+        lock, store = self._shard(email)
+        with lock:
+            now = store.clock()
+            record = store.get(email, now)
+            if record is None or record.otp is None:
+                return MISSING
+            if now > record.expiry:
+                return EXPIRED
+            if entered_otp != str(record.otp):
+                record.failures += 1
+                if record.failures < self.max_attempts:
+                    return INVALID
+                store.consume(email)
+                return LOCKED
+            store.consume(email)
+        return VERIFIED
+
+    def stats(self):
+        """Size, peak, expired/evicted counts summed over the shards"""
+        total = {}
+        for lock, store in self.shards:
+            with lock:
+                for key, value in store.stats().items():
+                    total[key] = total.get(key, 0) + value
+        total["shards"] = len(self.shards)
+        return total
+
+
+class SQLiteBackend(OTPBackend):
+    """OTPs in a SQLite file in WAL mode, one connection per thread.
+
+    issue() is a single UPSERT whose DO UPDATE only fires once the cooldown
+    is over, and verify() a single UPDATE that clears the OTP only if it
+    matches and is unexpired; SQLite runs each statement atomically even with
+    several processes writing. A wrong OTP is counted by a second UPDATE
+    that also clears the OTP on the `max_attempts`-th. The extra SELECT that
+    explains a refusal only runs on the failure path. Rows past their
+    deadline are deleted every `purge_every` issues.
+    """
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS otp (email TEXT PRIMARY KEY, otp TEXT, expiry REAL, "
+              "requested REAL, deadline REAL, failures INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+              "CREATE INDEX IF NOT EXISTS otp_deadline ON otp (deadline)")
+    ISSUE = ("INSERT INTO otp VALUES (?, ?, ?, ?, ?, 0) ON CONFLICT (email) DO UPDATE SET "
+             "otp = excluded.otp, expiry = excluded.expiry, requested = excluded.requested, "
+             "deadline = excluded.deadline, failures = 0 WHERE excluded.requested >= otp.requested + ?")
+    VERIFY = "UPDATE otp SET otp = NULL WHERE email = ? AND otp = ? AND expiry >= ?"
+    # SET expressions see the row as it was, so both use the old failure count
+    FAIL = ("UPDATE otp SET failures = failures + 1, otp = CASE WHEN failures + 1 >= ? THEN NULL "
+            "ELSE otp END WHERE email = ? AND otp IS NOT NULL AND otp != ? AND expiry >= ?")
+
+    def __init__(self, path, expiry_time=120, cooldown_time=30, keep_expired=60, purge_every=1000,
+                 timeout=5.0, max_attempts=5):
+        self.path = path
+        self.expiry_time = expiry_time
+        self.cooldown_time = cooldown_time
+        self.max_attempts = max_attempts
+        self.keep_expired = keep_expired
+        self.purge_every = purge_every
+        self.timeout = timeout
+        self.expired = 0
+        self._issued = 0
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        db = self._db()
+        for statement in self.SCHEMA:
+            db.execute(statement)
+        if "failures" not in [row[1] for row in db.execute("PRAGMA table_info(otp)")]:
+            # A file from before wrong attempts were counted
+            import sqlite3
+
+            try:
+                db.execute("ALTER TABLE otp ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass    # another process added it first
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3      # only for this backend
+
+            # Autocommit: every statement is its own transaction
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                 check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def issue(self, email, otp):
+        db = self._db()
+        now = time.time()
+        expiry = now + self.expiry_time
+        deadline = max(expiry + self.keep_expired, now + self.cooldown_time)
+        if db.execute(self.ISSUE, (email, str(otp), expiry, now, deadline, self.cooldown_time)).rowcount:
+            with self._lock:
+                self._issued += 1
+                purge = self._issued % self.purge_every == 0
+            if purge:
+                self.purge(now)
+            return 0.0
+        # Refused, so the email was cooling down when the statement ran
+        row = db.execute("SELECT requested FROM otp WHERE email = ?", (email,)).fetchone()
+        return max(1e-3, row[0] + self.cooldown_time - now) if row else 1e-3
+
+    def verify(self, email, entered_otp):
+        db = self._db()
+        now = time.time()
+        if db.execute(self.VERIFY, (email, entered_otp, now)).rowcount:
+            return VERIFIED
+        if db.execute(self.FAIL, (self.max_attempts, email, entered_otp, now)).rowcount:
+            # The count only grows until the next issue, so this sees our attempt or later ones
+            row = db.execute("SELECT failures FROM otp WHERE email = ?", (email,)).fetchone()
+            return LOCKED if row and row[0] >= self.max_attempts else INVALID
+        row = db.execute("SELECT otp, expiry, deadline FROM otp WHERE email = ?", (email,)).fetchone()
+        if row is None or row[0] is None or row[2] <= now:
+            return MISSING
+        return EXPIRED if now > row[1] else INVALID
+
+    def purge(self, now=None):
+        """Delete rows past their deadline; returns how many were deleted"""
+        deleted = self._db().execute("DELETE FROM otp WHERE deadline <= ?",
+                                     (time.time() if now is None else now,)).rowcount
+        with self._lock:
+            self.expired += deleted
+        return deleted
+
+    def stats(self):
+        size = self._db().execute("SELECT count(*) FROM otp").fetchone()[0]
+        return {"size": size, "expired": self.expired}
+
+    def close(self):
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class RedisError(Exception):
+    pass
+
+
+class RespConnection:
+    """Minimal Redis protocol (RESP2) client: send a command, read one reply"""
+
+    def __init__(self, host="127.0.0.1", port=6379, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts += [b"$%d\r\n" % len(data), data, b"\r\n"]
+        self.sock.sendall(b"".join(parts))
+        return self._reply()
+
+    def _reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else self.reader.read(size + 2)[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._reply() for _ in range(size)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+# The value of otp:<email> is "<otp>:<failures>:<expiry ms>:<requested ms>";
+# "-" marks a used or burned OTP
+ISSUE_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+  local requested = tonumber(string.match(value, ':(%d+)$'))
+  local wait = requested + tonumber(ARGV[4]) - tonumber(ARGV[2])
+  if wait > 0 then return wait end
+end
+redis.call('SET', KEYS[1], ARGV[1] .. ':0:' .. ARGV[3] .. ':' .. ARGV[2], 'PX', ARGV[5])
+return 0
+"""
+VERIFY_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value then return 'missing' end
+local otp, failures, expiry, requested = string.match(value, '^(.*):(%d+):(%d+):(%d+)$')
+if not otp or otp == '-' then return 'missing' end
+if tonumber(ARGV[2]) > tonumber(expiry) then return 'expired' end
+local status = 'verified'
+if otp ~= ARGV[1] then
+  failures = tonumber(failures) + 1
+  if failures < tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[1], otp .. ':' .. failures .. ':' .. expiry .. ':' .. requested, 'KEEPTTL')
+    return 'invalid'
+  end
+  status = 'locked'
+end
+redis.call('SET', KEYS[1], '-:' .. failures .. ':' .. expiry .. ':' .. requested, 'KEEPTTL')
+return status
+"""
+ISSUE_SHA = hashlib.sha1(ISSUE_SCRIPT.encode()).hexdigest()
+VERIFY_SHA = hashlib.sha1(VERIFY_SCRIPT.encode()).hexdigest()
+
+
+class RedisBackend(OTPBackend):
+    """OTPs in Redis (or anything speaking its protocol), one connection per thread.
+
+    Each operation is one EVALSHA of a Lua script, which Redis runs
+    atomically; the script is sent in full only the first time a server
+    answers NOSCRIPT. Keys expire by themselves (PX) at their deadline.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, expiry_time=120, cooldown_time=30,
+                 keep_expired=60, prefix="otp:", timeout=5.0, max_attempts=5):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.expiry_time = expiry_time
+        self.cooldown_time = cooldown_time
+        self.max_attempts = max_attempts
+        self.keep_expired = keep_expired
+        self.prefix = prefix
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = RespConnection(self.host, self.port, self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _eval(self, sha, script, key, *args):
+        conn = self._conn()
+        try:
+            try:
+                return conn.command("EVALSHA", sha, 1, self.prefix + key, *args)
+            except RedisError as e:
+                if not str(e).startswith("NOSCRIPT"):
+                    raise
+                return conn.command("EVAL", script, 1, self.prefix + key, *args)
+        except OSError:
+            # Not retried: the script may have run before the connection broke.
+            # The next call opens a new connection.
+            self._local.conn = None
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+            raise
+
+    def issue(self, email, otp):
+        now = int(time.time() * 1000)
+        expiry = now + int(self.expiry_time * 1000)
+        ttl = max(expiry + int(self.keep_expired * 1000), now + int(self.cooldown_time * 1000)) - now
+        wait = self._eval(ISSUE_SHA, ISSUE_SCRIPT, email, otp, now, expiry,
+                          int(self.cooldown_time * 1000), ttl)
+        return wait / 1000
+
+    def verify(self, email, entered_otp):
+        return self._eval(VERIFY_SHA, VERIFY_SCRIPT, email, entered_otp, int(time.time() * 1000),
+                          self.max_attempts)
+
+    def stats(self):
+        return {"size": self._conn().command("DBSIZE")}
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
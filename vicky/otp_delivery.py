@@ -0,0 +1,205 @@
+"""Background OTP mail delivery with retries and a dead-letter list.
+
+submit() puts a job on the queue and returns its DeliveryJob handle at once;
+worker threads call `send(email, otp)` for it. A failure the server may get
+over (disconnect, timeout, 4xx reply, no free connection) is retried after an
+exponentially growing, jittered delay; a permanent one (5xx reply, refused
+recipient) or running out of attempts puts the job on the dead-letter list.
+A job whose OTP expires before it could be sent is dropped, since the code
+in it is useless by then.
+
+    queue = DeliveryQueue(deliver_otp, workers=4)
+    job = queue.submit(email, otp, expires_at=time.monotonic() + 120)
+    ...
+    queue.stats()   # depth, in flight, delivered, retries, failed, expired, latency
+"""
+import heapq
+import itertools
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+QUEUED, SENDING, DELIVERED, FAILED, EXPIRED = "queued", "sending", "delivered", "failed", "expired"
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class DeliveryJob:
+    __slots__ = ("email", "otp", "expires_at", "submitted", "attempts", "status", "error",
+                 "latency", "_done")
+
+    def __init__(self, email, otp, expires_at):
+        self.email = email
+        self.otp = otp
+        self.expires_at = expires_at
+        self.submitted = time.monotonic()
+        self.attempts = 0
+        self.status = QUEUED
+        self.error = None
+        self.latency = None     # seconds from submit to delivery
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job is delivered, failed or expired; returns the status"""
+        self._done.wait(timeout)
+        return self.status
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+
+def is_permanent(error):
+    """True for failures a retry cannot fix"""
+    import smtplib      # loaded by the sender already; not needed to import the queue
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class DeliveryQueue:
+    def __init__(self, send, workers=4, max_attempts=5, base_delay=0.5, max_delay=30.0,
+                 max_queue=10_000, dead_letter_size=1000, on_done=None):
+        self.send = send
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.on_done = on_done
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        self._heap = []             # [(ready_at, seq, job)]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()     # shared by workers and join(), hence notify_all
+        self._closing = False
+        self._in_flight = 0
+        self._latencies = deque(maxlen=10_000)
+        self.counters = {"submitted": 0, "delivered": 0, "retries": 0, "failed": 0, "expired": 0,
+                         "callback_errors": 0}
+        self._workers = [threading.Thread(target=self._run, name=f"otp-delivery-{n}", daemon=True)
+                         for n in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, email, otp, expires_at=None):
+        """Queue an OTP mail; returns its DeliveryJob without waiting for SMTP"""
+        job = DeliveryJob(email, otp, expires_at)
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Delivery queue is closed")
+            if len(self._heap) >= self.max_queue:
+                raise QueueFull(f"{len(self._heap)} OTP mails already waiting")
+            self.counters["submitted"] += 1
+            heapq.heappush(self._heap, (job.submitted, next(self._seq), job))
+            self._cond.notify_all()
+        return job
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._heap:
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        self._in_flight += 1
+                        return heapq.heappop(self._heap)[2]
+                elif self._closing:
+                    return None
+                else:
+                    wait = None
+                self._cond.wait(wait)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._attempt(job)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _attempt(self, job):
+        if job.expires_at is not None and time.monotonic() >= job.expires_at:
+            self._finish(job, EXPIRED, "expired")
+            return
+        job.status = SENDING
+        job.attempts += 1
+        try:
+            self.send(job.email, job.otp)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            if is_permanent(e) or job.attempts >= self.max_attempts:
+                self.dead_letters.append(job)
+                self._finish(job, FAILED, "failed")
+                return
+            delay = min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1))
+            ready_at = time.monotonic() + delay * random.uniform(0.8, 1.2)
+            if job.expires_at is not None and ready_at >= job.expires_at:
+                self._finish(job, EXPIRED, "expired")
+                return
+            job.status = QUEUED
+            with self._cond:
+                self.counters["retries"] += 1
+                heapq.heappush(self._heap, (ready_at, next(self._seq), job))
+                self._cond.notify_all()
+            return
+        job.error = None
+        job.latency = time.monotonic() - job.submitted
+        self._finish(job, DELIVERED, "delivered")
+
+    def _finish(self, job, status, counter):
+        job.status = status
+        with self._cond:
+            self.counters[counter] += 1
+            if status == DELIVERED:
+                self._latencies.append(job.latency)
+        job._done.set()
+        if self.on_done is not None:
+            # A failing callback must not kill the worker thread
+            try:
+                self.on_done(job)
+            except Exception:
+                with self._cond:
+                    self.counters["callback_errors"] += 1
+                log.exception("on_done callback failed for OTP mail to %s", job.email)
+
+    def stats(self):
+        """Queue depth, jobs in flight, counters and delivery latency (ms) of recent jobs"""
+        with self._cond:
+            stats = dict(self.counters, depth=len(self._heap), in_flight=self._in_flight,
+                         dead_letters=len(self.dead_letters))
+            latencies = list(self._latencies)
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            stats.update(latency_p50_ms=round(cuts[49] * 1000, 1), latency_p95_ms=round(cuts[94] * 1000, 1))
+        return stats
+
+    def join(self, timeout=None):
+        """Wait until nothing is queued or being sent; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._in_flight:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def close(self, timeout=None):
+        """Let the workers finish what is queued (retries included), then stop them"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
@@ -84,77 +84,186 @@
 #         success, msg = otp_manager.validate_otp(email, user_input)
 #         print(msg)
 
+import math
 import random
-import smtplib
+import threading
 import time
 
+from common import metrics
+from vicky.otp_backends import EXPIRED, INVALID, LOCKED, MISSING, VERIFIED, MemoryBackend
+from vicky.rate_limit import default_rate_limiter
 
-class OTPManager:
-    def __init__(self, expiry_time=120, cooldown_time=30):
-        self.otp_storage = {}       # {email: (otp, expiry_timestamp)}
-        self.last_request = {}      # {email: last_request_timestamp}
-        self.expiry_time = expiry_time
-        self.cooldown_time = cooldown_time
+SENDER_EMAIL = "Enter_Your_Email_Id"
+SENDER_PASSWORD = "Enter_Your_Gmail_App_Password"  # Gmail App Password
 
-    def generate_otp(self, email):
-        """Generate OTP with cooldown"""
-        now = time.time()
+VALIDATION_MESSAGES = {
+    VERIFIED: "✅ OTP verified successfully",
+    INVALID: "❌ Invalid OTP",
+    EXPIRED: "⌛ OTP expired",
+    MISSING: "❌ No OTP generated for this email",
+    LOCKED: "🔒 Too many wrong OTPs; this one is no longer valid, please request a new one",
+}
 
-        # Check cooldown
-        if email in self.last_request and (now - self.last_request[email]) < self.cooldown_time:
-            wait_time = int(self.cooldown_time - (now - self.last_request[email]))
-            return None, f"⏳ Cooldown active! Please wait {wait_time} seconds before requesting a new OTP."
+GENERATED = metrics.counter("kyc_otp_generate_total", "OTP requests by outcome", ["result"])
+VALIDATED = metrics.counter("kyc_otp_validate_total", "OTP validations by outcome", ["result"])
 
-        # Generate OTP
-        otp = str(random.randint(100000, 999999))
-        expiry = now + self.expiry_time
-        self.otp_storage[email] = (otp, expiry)
-        self.last_request[email] = now
 
-        return otp, f"✅ OTP generated successfully! (Cooldown {self.cooldown_time} sec)"
+class OTPManager:
+    """Thread-safe OTP issue/validation.
+
+    The state lives in a backend (see vicky.otp_backends): by default sharded
+    in-process memory, or SQLite/Redis so several worker processes or nodes
+    share it. The cooldown check and the write, and the OTP comparison and
+    the consume, are each one atomic backend operation, so two concurrent
+    requests for an email can never both pass the cooldown or both use the
+    same OTP.
+    """
+
+    def __init__(self, expiry_time=120, cooldown_time=30, max_entries=1_000_000, shards=16,
+                 backend=None, rate_limiter=None):
+        # A given backend brings its own expiry/cooldown settings
+        self.backend = backend or MemoryBackend(expiry_time, cooldown_time, max_entries, shards)
+        self.expiry_time = self.backend.expiry_time
+        self.cooldown_time = self.backend.cooldown_time
+        # Per email/IP/global limits on top of the cooldown (see vicky.rate_limit)
+        self.rate_limiter = rate_limiter
+
+    @metrics.timed("otp.generate")
+    def generate_otp(self, email, client_ip=None):
+        """Generate OTP with cooldown"""
+        if self.rate_limiter is not None:
+            allowed, rule, wait = self.rate_limiter.check(email=email, ip=client_ip)
+            if not allowed:
+                GENERATED.inc("rate_limited")
+                return None, (f"🚫 Too many OTP requests ({rule} limit). "
+                              f"Please try again in {math.ceil(wait)} seconds.")
+
+        otp = random.randint(100000, 999999)
+
+        # Check cooldown and store the OTP in one step
+        wait = self.backend.issue(email, otp)
+        if wait > 0:
+            if self.rate_limiter is not None:
+                # Resend presses refused by the cooldown must not use up the allowance
+                self.rate_limiter.refund(email=email, ip=client_ip)
+            GENERATED.inc("cooldown")
+            wait_time = int(wait)
+            return None, f"⏳ Cooldown active! Please wait {wait_time} seconds before requesting a new OTP."
+
+        GENERATED.inc("issued")
+        return str(otp), f"✅ OTP generated successfully! (Cooldown {self.cooldown_time} sec)"
 
+    @metrics.timed("otp.validate")
     def validate_otp(self, email, entered_otp):
-        """Validate OTP"""
-        if email not in self.otp_storage:
-            return False, "❌ No OTP generated for this email"
+        """Validate OTP; a correct OTP is consumed, so it verifies only once"""
+        status = self.backend.verify(email, entered_otp)
+        VALIDATED.inc(status)
+        return status == VERIFIED, VALIDATION_MESSAGES[status]
 
-        otp, expiry = self.otp_storage[email]
+    def stats(self):
+        """Backend size and expiry/eviction counters"""
+        return self.backend.stats()
 
-        if time.time() > expiry:
-            return False, "⌛ OTP expired"
+    def close(self):
+        self.backend.close()
 
-        if entered_otp == otp:
-            del self.otp_storage[email]  # remove after success
-            return True, "✅ OTP verified successfully"
-        else:
-            return False, "❌ Invalid OTP"
 
+class AsyncOTPManager:
+    """OTPManager for asyncio servers.
 
-def send_email(receiver_email, otp):
-    try:
-        sender_email = "Enter_Your_Email_Id"
-        sender_password = "Enter_Your_Gmail_App_Password"  # Gmail App Password
+    With the default MemoryBackend, issue and validation are in-memory work
+    of a few microseconds and the shard locks are never held across an
+    await, so the coroutines run them inline instead of paying for a thread
+    hop. SQLite and Redis backends block on disk or the network (up to their
+    timeout), so their calls run in `executor` (None = the loop's default
+    thread pool). Pass an existing OTPManager as `manager` to share it with
+    threaded code; it is also available as `.manager`.
+    """
+
+    def __init__(self, *args, manager=None, executor=None, **kwargs):
+        self.manager = manager or OTPManager(*args, **kwargs)
+        self.cooldown_time = self.manager.cooldown_time
+        self.executor = executor
+        self.offload = self.manager.backend.blocking
+
+    async def _call(self, func, *args):
+        if not self.offload:
+            return func(*args)
+        import asyncio      # already loaded: this only runs inside a coroutine
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def generate_otp(self, email, client_ip=None):
+        return await self._call(self.manager.generate_otp, email, client_ip)
+
+    async def validate_otp(self, email, entered_otp):
+        return await self._call(self.manager.validate_otp, email, entered_otp)
+
+    def stats(self):
+        return self.manager.stats()
+
+
+_mailer = None
+_mailer_lock = threading.Lock()
 
-        subject = "Your OTP Code"
-        body = f"Your OTP is {otp}. It will expire in 2 minutes."
 
-        message = f"Subject: {subject}\n\n{body}"
+def get_mailer():
+    """Process-wide pool of logged-in Gmail SMTP sessions, opened on first use"""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            # smtplib and ssl are only loaded once mail is actually sent
+            from vicky.smtp_pool import SMTPPool
 
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, receiver_email, message)
+            _mailer = SMTPPool("smtp.gmail.com", 587, SENDER_EMAIL, SENDER_PASSWORD)
+        return _mailer
 
+
+def deliver_otp(receiver_email, otp, mailer=None):
+    """Send the OTP mail; raises on failure (used by the delivery queue)"""
+    mailer = mailer or get_mailer()
+
+    subject = "Your OTP Code"
+    body = f"Your OTP is {otp}. It will expire in 2 minutes."
+
+    message = f"Subject: {subject}\n\n{body}"
+
+    # Reuses an authenticated session instead of STARTTLS + login per OTP
+    mailer.send(mailer.username or SENDER_EMAIL, [receiver_email], message)
+
+
+def send_email(receiver_email, otp, mailer=None):
+    """Send the OTP mail right away, blocking until SMTP is done"""
+    try:
+        deliver_otp(receiver_email, otp, mailer)
         print(f"📧 OTP sent successfully to {receiver_email}")
     except Exception as e:
         print("❌ Failed to send email:", e)
 
 
+def report_delivery(job):
+    from vicky.otp_delivery import DELIVERED
+
+    if job.status == DELIVERED:
+        print(f"📧 OTP sent successfully to {job.email}")
+    else:
+        print(f"❌ Failed to send email ({job.status} after {job.attempts} attempts):", job.error)
+
+
+def queue_email(delivery, receiver_email, otp, expiry_time):
+    """Hand the OTP mail to the background queue; returns its job handle immediately"""
+    return delivery.submit(receiver_email, otp, expires_at=time.monotonic() + expiry_time)
+
+
 # ==============================
 # Example Usage with Resend Option
 # ==============================
-if __name__ == "__main__":
-    otp_manager = OTPManager()
+def main():
+    from vicky.otp_delivery import DeliveryQueue
+
+    otp_manager = OTPManager(rate_limiter=default_rate_limiter())
+    # Mail goes out on background workers, retried on failure
+    delivery = DeliveryQueue(deliver_otp, workers=2, on_done=report_delivery)
 
     email = input("Enter your email address: ")
 
@@ -164,7 +273,7 @@ if __name__ == "__main__":
         print(msg)
 
         if otp:  # Only send if OTP generated
-            send_email(email, otp)
+            queue_email(delivery, email, otp, otp_manager.expiry_time)
             print(f"⚠️ You cannot request another OTP for {otp_manager.cooldown_time} seconds.\n")
 
         # Ask user for OTP or resend
@@ -185,5 +294,12 @@ if __name__ == "__main__":
             if retry != "yes":
                 break
 
+    delivery.close(timeout=10)
 
+    # KYC_METRICS=1 python -m vicky.otp_email shows where the time went
+    if metrics.enabled():
+        print(metrics.report())
 
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Rate limits on OTP issuance, by email, client IP and globally.
+
+The per-email cooldown does nothing against an attacker rotating emails or
+hammering from one IP. RateLimiter checks a request against several rules at
+once and refuses it if any rule is over its limit. Each rule is one of:
+
+* TokenBucket(capacity, per_second) - bursts up to `capacity`, then a steady
+  refill rate
+* SlidingWindow(limit, window)      - at most about `limit` requests in any
+  `window` seconds, estimated from the counts of the current and previous
+  fixed windows (the sliding-window-counter approximation)
+
+State per key is one small __slots__ object (O(1) memory per key). Idle keys
+expire without a heap or timers: states live in two dict generations that
+rotate every `idle_ttl` seconds, a state used since the last rotation moves
+to the current one, and a whole generation unused for `idle_ttl` is dropped.
+idle_ttl is the time after which an idle key is back to a fresh state, so
+expiring it never changes a decision.
+"""
+import math
+import threading
+import time
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class _Window:
+    __slots__ = ("index", "count", "previous")
+
+    def __init__(self, index, count, previous):
+        self.index = index
+        self.count = count
+        self.previous = previous
+
+
+class _KeyedLimiter:
+    idle_ttl = 60.0
+
+    def __init__(self):
+        self._current = {}
+        self._old = {}
+        self._rotate_at = None
+
+    def _state(self, key, now):
+        if self._rotate_at is None or now >= self._rotate_at:
+            # Keys untouched for a whole generation are dropped with _old
+            fresh = self._rotate_at is not None and now - self._rotate_at < self.idle_ttl
+            self._old = self._current if fresh else {}
+            self._current = {}
+            self._rotate_at = now + self.idle_ttl
+        state = self._current.get(key)
+        if state is None:
+            state = self._old.pop(key, None)
+            if state is not None:
+                self._current[key] = state
+        return state
+
+    def __len__(self):
+        return len(self._current) + len(self._old)
+
+
+class TokenBucket(_KeyedLimiter):
+    def __init__(self, capacity, per_second):
+        super().__init__()
+        self.capacity = capacity
+        self.rate = per_second
+        self.idle_ttl = capacity / per_second     # time to refill an empty bucket
+
+    def retry_after(self, state, now):
+        """Seconds until the key with `state` may make a request (0 if it may now)"""
+        if state is None:
+            return 0.0
+        tokens = min(self.capacity, state.tokens + (now - state.updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def consume(self, key, state, now):
+        if state is None:
+            self._current[key] = _Bucket(self.capacity - 1, now)
+        else:
+            state.tokens = min(self.capacity, state.tokens + (now - state.updated) * self.rate) - 1
+            state.updated = now
+
+    def refund(self, state):
+        state.tokens = min(self.capacity, state.tokens + 1)
+
+
+class SlidingWindow(_KeyedLimiter):
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.idle_ttl = 2 * window                # both counted windows are over
+
+    def _counts(self, state, index):
+        if state is None or state.index < index - 1:
+            return 0, 0
+        if state.index == index:
+            return state.count, state.previous
+        return 0, state.count
+
+    def retry_after(self, state, now):
+        position = now / self.window
+        index = math.floor(position)
+        count, previous = self._counts(state, index)
+        elapsed = position - index
+        if previous * (1 - elapsed) + count + 1 <= self.limit:
+            return 0.0
+        if count + 1 <= self.limit:
+            # Wait until enough of the previous window has slid out
+            needed = 1 - (self.limit - 1 - count) / previous
+            return max(0.0, needed - elapsed) * self.window
+        # Over the limit in this window alone: into the next one, where this count is "previous"
+        needed = 1 - (self.limit - 1) / count if self.limit > 1 else 1.0
+        return (1 - elapsed + max(0.0, needed)) * self.window
+
+    def consume(self, key, state, now):
+        index = math.floor(now / self.window)
+        count, previous = self._counts(state, index)
+        if state is None:
+            self._current[key] = _Window(index, count + 1, previous)
+        else:
+            state.index, state.count, state.previous = index, count + 1, previous
+
+    def refund(self, state):
+        # The request was counted in the state's latest window
+        state.count = max(0, state.count - 1)
+
+
+class RateLimiter:
+    """All of `rules` ({name: limiter}) must allow a request for it to pass.
+
+    check(email=..., ip=...) looks each rule up by its name among the keyword
+    arguments; the rule named "global" always applies, under one shared key.
+    A refused request consumes nothing, so a client blocked by one rule does
+    not also use up its allowance under the others.
+
+    An allowed request is charged in the same locked step as the check, so
+    concurrent requests can never all slip through before any is counted.
+    Work refused later (an OTP cooldown) gives its allowance back with
+    refund(...).
+    """
+
+    def __init__(self, rules, clock=time.monotonic):
+        self.rules = list(rules.items())
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.refunded = 0
+        self.denied = dict.fromkeys(rules, 0)
+
+    def check(self, **keys):
+        """Return (allowed, name of the refusing rule or None, seconds to wait)"""
+        with self._lock:
+            now = self.clock()
+            states = []
+            for name, limiter in self.rules:
+                key = "*" if name == "global" else keys.get(name)
+                if key is None:
+                    continue
+                state = limiter._state(key, now)
+                wait = limiter.retry_after(state, now)
+                if wait > 0:
+                    self.denied[name] += 1
+                    return False, name, wait
+                states.append((limiter, key, state))
+            for limiter, key, state in states:
+                limiter.consume(key, state, now)
+            self.allowed += 1
+            return True, None, 0.0
+
+    def refund(self, **keys):
+        """Give back what an allowed check(...) with the same keys consumed"""
+        with self._lock:
+            now = self.clock()
+            for name, limiter in self.rules:
+                key = "*" if name == "global" else keys.get(name)
+                if key is None:
+                    continue
+                state = limiter._state(key, now)
+                if state is not None:
+                    limiter.refund(state)
+            self.refunded += 1
+
+    def stats(self):
+        with self._lock:
+            return {"allowed": self.allowed, "refunded": self.refunded, "denied": dict(self.denied),
+                    "keys": {name: len(limiter) for name, limiter in self.rules}}
+
+
+def default_rate_limiter():
+    """5 OTPs per email per hour, 20 per IP per 10 minutes, 200/sec in total"""
+    return RateLimiter({
+        "email": TokenBucket(5, 5 / 3600),
+        "ip": SlidingWindow(20, 600),
+        "global": TokenBucket(400, 200),
+    })
@@ -0,0 +1,191 @@
+"""Pool of authenticated SMTP sessions.
+
+send_email used to open a connection, STARTTLS, log in, send one message and
+quit for every OTP; the handshake and login cost far more than the send and
+trip the provider's connection limits at peak. SMTPPool keeps logged-in
+sessions open and hands them to senders:
+
+* at most `max_connections` sessions to the host at once; further senders
+  wait for a free one (up to `wait_timeout`)
+* a session idle for more than `keepalive` seconds is checked with NOOP
+  before reuse, one idle for more than `max_idle` is closed (servers drop
+  idle clients anyway), and one that sent `max_messages` is replaced
+* if the session breaks mid-send (disconnect, reset, timeout), the message
+  is retried once on a fresh session; the server may then get it twice,
+  which for an OTP mail is better than not at all. Refusals by the server
+  (bad recipient, rejected data) are raised without a retry and the session
+  is kept.
+"""
+import smtplib
+import socket
+import ssl
+import threading
+import time
+
+from common import metrics
+
+EVENTS = metrics.counter("kyc_smtp_pool_events_total",
+                         "SMTP pool sessions opened/reused/stale and messages sent/failed", ["event"])
+
+
+class SMTPPoolTimeout(Exception):
+    pass
+
+
+class PooledSMTP:
+    __slots__ = ("smtp", "last_used", "messages")
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages = 0
+
+
+class SMTPPool:
+    def __init__(self, host, port=587, username=None, password=None, starttls=True,
+                 max_connections=4, keepalive=30.0, max_idle=240.0, max_messages=100,
+                 timeout=30.0, wait_timeout=60.0, smtp_class=smtplib.SMTP):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls = starttls
+        self.max_connections = max_connections
+        self.keepalive = keepalive
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+        self.smtp_class = smtp_class
+        self._idle = []         # most recently used last
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.counters = {"opened": 0, "reused": 0, "noops": 0, "stale": 0, "reconnects": 0,
+                         "sent": 0, "failed": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+        EVENTS.inc(name)
+
+    def _connect(self):
+        with metrics.span("smtp.connect"):
+            smtp = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                with metrics.span("smtp.starttls"):
+                    smtp.starttls(context=ssl.create_default_context())
+                    smtp.ehlo()
+            if self.username:
+                with metrics.span("smtp.login"):
+                    smtp.login(self.username, self.password)
+        except BaseException:
+            self._quit(smtp)
+            raise
+        self._count("opened")
+        return PooledSMTP(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _alive(self, session):
+        """Drop sessions idle too long; NOOP-check ones idle longer than `keepalive`"""
+        idle = time.monotonic() - session.last_used
+        if idle > self.max_idle or session.messages >= self.max_messages:
+            return False
+        if idle > self.keepalive:
+            self._count("noops")
+            try:
+                return session.smtp.noop()[0] == 250
+            except (smtplib.SMTPException, OSError):
+                return False
+        return True
+
+    def _checkout(self, fresh=False):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise SMTPPoolTimeout(f"No SMTP connection to {self.host} free after {self.wait_timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    session = self._idle.pop() if self._idle and not fresh else None
+                if session is None:
+                    return self._connect()
+                if self._alive(session):
+                    self._count("reused")
+                    return session
+                self._count("stale")
+                self._quit(session.smtp)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, session, keep=True):
+        try:
+            if keep and not self._closed:
+                session.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+            else:
+                self._quit(session.smtp)
+        finally:
+            self._slots.release()
+
+    def send(self, sender, recipients, message):
+        """Send one message; returns smtplib's dict of refused recipients"""
+        for attempt in (1, 2):
+            # The retry gets a new session: the idle ones may be just as dead
+            session = self._checkout(fresh=attempt == 2)
+            try:
+                with metrics.span("smtp.send"):
+                    refused = session.smtp.sendmail(sender, recipients, message)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server refused this message; the session itself is fine
+                self._reset(session)
+                self._count("failed")
+                raise
+            # Not OSError: SMTPException subclasses it, so it would take refusals too
+            except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout):
+                self._checkin(session, keep=False)
+                if attempt == 2:
+                    self._count("failed")
+                    raise
+                self._count("reconnects")
+                continue
+            except BaseException:
+                self._checkin(session, keep=False)
+                self._count("failed")
+                raise
+            session.messages += 1
+            self._checkin(session)
+            self._count("sent")
+            return refused
+
+    def _reset(self, session):
+        try:
+            session.smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            self._checkin(session, keep=False)
+        else:
+            self._checkin(session)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, idle=len(self._idle))
+
+    def close(self):
+        """Quit every idle session; sessions in use are closed when returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._quit(session.smtp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,211 @@
+"""Local stand-in for a Redis server, for testing and benchmarking RedisBackend.
+
+Speaks the Redis protocol (RESP2) over TCP and keeps keys in a dict with
+millisecond expiry. It supports PING, GET, SET (NX/XX/PX/EX/KEEPTTL), DEL,
+DBSIZE, FLUSHALL and SCRIPT LOAD. There is no Lua interpreter: EVAL/EVALSHA
+run Python versions of the two scripts in vicky.otp_backends, looked up
+by SHA1, and answer NOSCRIPT for anything else. Every command runs under one
+lock, so scripts are atomic as they are in Redis.
+
+    python -m vicky.stub_redis_server --port 6390
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from vicky.otp_backends import ISSUE_SCRIPT, ISSUE_SHA, VERIFY_SCRIPT, VERIFY_SHA
+
+
+class CommandError(Exception):
+    pass
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _issue_script(server, key, otp, now, expiry, cooldown, ttl):
+    value = server.get(key)
+    if value is not None:
+        wait = int(value.rsplit(":", 1)[1]) + int(cooldown) - int(now)
+        if wait > 0:
+            return wait
+    server.set(key, f"{otp}:0:{expiry}:{now}", _now_ms() + int(ttl))
+    return 0
+
+
+def _verify_script(server, key, entered_otp, now, max_attempts):
+    value = server.get(key)
+    if value is None:
+        return "missing"
+    parts = value.rsplit(":", 3)
+    if len(parts) != 4 or parts[0] == "-":
+        return "missing"
+    otp, failures, expiry, requested = parts
+    if int(now) > int(expiry):
+        return "expired"
+    status = "verified"
+    if otp != entered_otp:
+        failures = int(failures) + 1
+        if failures < int(max_attempts):
+            server.set(key, f"{otp}:{failures}:{expiry}:{requested}", server.expires.get(key))
+            return "invalid"
+        status = "locked"
+    server.set(key, f"-:{failures}:{expiry}:{requested}", server.expires.get(key))
+    return status
+
+
+SCRIPTS = {ISSUE_SHA: _issue_script, VERIFY_SHA: _verify_script}
+SCRIPT_SHAS = {ISSUE_SCRIPT: ISSUE_SHA, VERIFY_SCRIPT: VERIFY_SHA}
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                with self.server.lock:
+                    reply = self.server.execute(args)
+            except CommandError as e:
+                self.wfile.write(f"-{e}\r\n".encode())
+            else:
+                self.wfile.write(encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode().split()     # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2].decode())
+        return args
+
+
+def encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return b"+OK\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+    data = reply.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class StubRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.data = {}
+        self.expires = {}       # key -> expiry in ms since the epoch
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}"
+
+    def get(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= _now_ms():
+            self.delete(key)
+        return self.data.get(key)
+
+    def set(self, key, value, expires=None):
+        self.data[key] = value
+        if expires is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = expires
+
+    def delete(self, key):
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def execute(self, args):
+        self.commands += 1
+        name, args = args[0].upper(), args[1:]
+        if name == "PING":
+            return "PONG" if not args else args[0]
+        if name == "GET":
+            return self.get(args[0])
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            return sum(self.delete(key) for key in args)
+        if name == "DBSIZE":
+            for key in list(self.data):
+                self.get(key)
+            return len(self.data)
+        if name == "FLUSHALL":
+            self.data.clear()
+            self.expires.clear()
+            return True
+        if name == "SCRIPT" and args and args[0].upper() == "LOAD":
+            if args[1] not in SCRIPT_SHAS:
+                raise CommandError("ERR the stub server only knows the OTP scripts")
+            return SCRIPT_SHAS[args[1]]
+        if name in ("EVAL", "EVALSHA"):
+            sha = SCRIPT_SHAS.get(args[0]) if name == "EVAL" else args[0]
+            script = SCRIPTS.get(sha)
+            if script is None:
+                raise CommandError("NOSCRIPT No matching script. Please use EVAL.")
+            keys = int(args[1])
+            return script(self, *args[2:2 + keys], *args[2 + keys:])
+        raise CommandError(f"ERR unknown command '{name}'")
+
+    def _set(self, args):
+        key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+        exists = self.get(key) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        expires = None
+        if "KEEPTTL" in options:
+            expires = self.expires.get(key)
+        for unit, scale in (("PX", 1), ("EX", 1000)):
+            if unit in options:
+                expires = _now_ms() + int(args[2 + options.index(unit) + 1]) * scale
+        self.set(key, value, expires)
+        return True
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    """Start a stub server on a background thread; call .shutdown() when done"""
+    server = StubRedisServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = StubRedisServer((args.host, args.port))
+    print(f"Stub Redis server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.commands} commands")
+
+
+if __name__ == "__main__":
+    main()
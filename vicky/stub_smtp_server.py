@@ -0,0 +1,130 @@
+"""Local SMTP sink for measuring mail throughput.
+
+Accepts EHLO/HELO, AUTH (PLAIN or LOGIN, any credentials), MAIL, RCPT, DATA,
+NOOP, RSET and QUIT, and counts the messages instead of delivering them.
+There is no TLS; `handshake` seconds are slept before the greeting and
+`auth` seconds on AUTH to stand in for the TCP+TLS handshake and login of a
+real provider, and `latency` seconds per message for queueing the mail.
+`idle_timeout` closes clients that stay silent, as real servers do, and
+RCPT TO an address in `refuse` is answered 550.
+
+    python -m vicky.stub_smtp_server --port 8025 --handshake 0.15 --auth 0.1
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+def _address(command):
+    """The address in 'RCPT TO:<user@example.com>'"""
+    return command.partition(":")[2].strip().lstrip("<").split(">", 1)[0].lower()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.count("connections")
+        self.connection.settimeout(server.idle_timeout)
+        time.sleep(server.handshake)
+        self.reply("220 stub ESMTP ready")
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    self.reply("250-stub greets you" if verb == "EHLO" else "250 stub")
+                    if verb == "EHLO":
+                        self.reply("250-AUTH PLAIN LOGIN")
+                        self.reply("250 8BITMIME")
+                elif verb == "AUTH":
+                    time.sleep(server.auth)
+                    if command.upper().startswith("AUTH LOGIN"):
+                        # Username and password prompts (base64 "Username:"/"Password:")
+                        for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6")[len(command.split()) - 2:]:
+                            self.reply(f"334 {prompt}")
+                            self.rfile.readline()
+                    server.count("logins")
+                    self.reply("235 Authentication successful")
+                elif verb == "RCPT" and _address(command) in server.refuse:
+                    server.count("refused")
+                    self.reply("550 5.1.1 No such user")
+                elif verb in ("MAIL", "RCPT", "RSET"):
+                    self.reply("250 OK")
+                elif verb == "NOOP":
+                    server.count("noops")
+                    self.reply("250 OK")
+                elif verb == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                        pass
+                    time.sleep(server.latency)
+                    server.count("messages")
+                    self.reply("250 OK queued")
+                elif verb == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+        except (socket.timeout, ConnectionError):
+            return
+
+    def reply(self, text):
+        self.wfile.write(text.encode() + b"\r\n")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handshake=0.0, auth=0.0, latency=0.0, idle_timeout=300.0,
+                 refuse=()):
+        super().__init__(address, SMTPHandler)
+        self.handshake = handshake
+        self.auth = auth
+        self.latency = latency
+        self.idle_timeout = idle_timeout
+        self.refuse = {address.lower() for address in refuse}
+        self.counters = {"connections": 0, "logins": 0, "noops": 0, "messages": 0, "refused": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+
+def start_stub_server(host="127.0.0.1", port=0, handshake=0.0, auth=0.0, latency=0.0,
+                      idle_timeout=300.0, refuse=()):
+    """Start a stub server on a background thread; call .shutdown() when done"""
+    server = StubSMTPServer((host, port), handshake, auth, latency, idle_timeout, refuse)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--handshake", type=float, default=0.15, help="seconds before the greeting")
+    parser.add_argument("--auth", type=float, default=0.1, help="seconds per login")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per message")
+    args = parser.parse_args()
+
+    server = StubSMTPServer((args.host, args.port), args.handshake, args.auth, args.latency)
+    print(f"Stub SMTP server on {args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Received {server.counters['messages']} messages over "
+              f"{server.counters['connections']} connections")
+
+
+if __name__ == "__main__":
+    main()